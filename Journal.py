@@ -1,7 +1,6 @@
 import sys
 import sqlite3
 import time
-import pygame
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QPushButton, QLabel, QMessageBox,
     QInputDialog, QWidget, QDialog, QListWidget, QListWidgetItem, QTextEdit
@@ -9,129 +8,162 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QSize  # Added QSize import
 from PyQt5.QtGui import QFont
 
+import audio
+import data_version
+import db
+import migrations
+import write_queue
+
+
+def display_date(value):
+    """Render a stored ISO-8601 timestamp as "YYYY-MM-DD HH:MM" for the UI."""
+    return (value or "").replace("T", " ")[:16]
+
 
 class Journal:
-    DB_FILE = 'journal.db'
+    DB_FILE = db.JOURNAL_DB
+    PAGE_SIZE = 100
+    DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"  # ISO-8601, sorts and range-scans as plain text
 
-    def __init__(self):
+    def __init__(self, user_id=db.LOCAL_USER):
+        self.user_id = user_id  # Only this user's entries are read and written
         self.conn = self.create_connection()
-        self.create_table()
+        db.init_schema(Journal.DB_FILE, 'journal', lambda: migrations.migrate(Journal.DB_FILE))
 
     def create_connection(self):
-        """Create a database connection."""
+        """Get this thread's shared connection to the journal database."""
         try:
-            return sqlite3.connect(Journal.DB_FILE)
+            return db.get_connection(Journal.DB_FILE)
         except sqlite3.Error as e:
             print(f"Error connecting to database: {e}")
         return None
 
-    def create_table(self):
-        """Create the journal_entries table if it doesn't exist."""
+    def bump_version(self):
+        """Mark the entries as changed for HTTP caches; see data_version.py."""
+        data_version.bump(Journal.DB_FILE, 'journal_entries')
+
+    def add_new_entry(self, title, content):
+        """Add a new journal entry.
+
+        The entry number is allocated inside the INSERT itself, so concurrent
+        writers can never be handed the same one. Numbers count per user.
+        """
+        entry_date = time.strftime(Journal.DATE_FORMAT, time.localtime())
+
+        def write(conn):
+            conn.execute('''
+                INSERT INTO journal_entries (user_id, number, title, content, date)
+                SELECT ?, COALESCE(MAX(number), 0) + 1, ?, ?, ?
+                FROM journal_entries
+                WHERE user_id = ?
+            ''', (self.user_id, title, content, entry_date, self.user_id))
+
         try:
-            with self.conn:
-                self.conn.execute('''
-                    CREATE TABLE IF NOT EXISTS journal_entries (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        number INTEGER,
-                        title TEXT,
-                        content TEXT,
-                        date TEXT
-                    )
-                ''')
+            write_queue.run(self.conn, Journal.DB_FILE, write, self.bump_version)
+            return "Entry added successfully."
         except sqlite3.Error as e:
-            print(f"Error creating table: {e}")
+            return f"Error saving entry to the database: {e}"
 
-    def add_new_entry(self, title, content):
-        """Add a new journal entry."""
-        entry_date = time.strftime("%d-%m-%Y", time.localtime())
-        entry_number = self.get_next_entry_number()
-
-        if entry_number:
-            try:
-                with self.conn:
-                    self.conn.execute('''
-                        INSERT INTO journal_entries (number, title, content, date)
-                        VALUES (?, ?, ?, ?)
-                    ''', (entry_number, title, content, entry_date))
-                return f"Entry #{entry_number} added successfully."
-            except sqlite3.Error as e:
-                return f"Error saving entry to the database: {e}"
-        else:
-            return "Failed to determine next entry number."
-
-    def get_next_entry_number(self):
-        """Get the next available entry number from the database."""
+    def get_all_entries(self):
+        """Get all journal entries.
+
+        Prefer iter_entries() or get_entries_page() for anything that only
+        needs to walk or display the journal.
+        """
+        return list(self.iter_entries())
+
+    def get_entries_page(self, after_number=0, limit=PAGE_SIZE):
+        """Get up to `limit` entries numbered after `after_number`.
+
+        Rows are (id, number, title, content, date); the mood recorded by the
+        mood journal in the same table is left out. Seeks on the (user, number)
+        index, so the cost depends on the page size and not on the size of the
+        journal or on how many other users have one.
+        """
         try:
             cursor = self.conn.cursor()
-            cursor.execute('SELECT MAX(number) FROM journal_entries')
-            result = cursor.fetchone()
-            return (result[0] or 0) + 1
+            cursor.execute('''
+                SELECT id, number, title, content, date FROM journal_entries
+                WHERE user_id = ? AND number > ?
+                ORDER BY number
+                LIMIT ?
+            ''', (self.user_id, after_number, limit))
+            return cursor.fetchall()
         except sqlite3.Error as e:
-            print(f"Error retrieving entry count: {e}")
-            return None
+            return []
 
-    def get_all_entries(self):
-        """Get all journal entries."""
+    def iter_entries(self, chunk_size=PAGE_SIZE):
+        """Yield every entry in number order, fetching one page at a time."""
+        after_number = 0
+        while True:
+            page = self.get_entries_page(after_number, chunk_size)
+            yield from page
+            if len(page) < chunk_size:
+                return
+            after_number = page[-1][1]
+
+    def get_entries_between(self, start, end):
+        """Get the entries written in [start, end), oldest first.
+
+        `start` and `end` are dates, datetimes or ISO-8601 strings; a plain
+        date as `end` means "before that day". Uses the (user, date) index.
+        """
+        start = start.isoformat() if hasattr(start, 'isoformat') else start
+        end = end.isoformat() if hasattr(end, 'isoformat') else end
         try:
             cursor = self.conn.cursor()
-            cursor.execute('SELECT * FROM journal_entries ORDER BY number')  # Order by number
-            rows = cursor.fetchall()
-            return rows
+            cursor.execute('''
+                SELECT id, number, title, content, date FROM journal_entries
+                WHERE user_id = ? AND date >= ? AND date < ?
+                ORDER BY date, number
+            ''', (self.user_id, start, end))
+            return cursor.fetchall()
         except sqlite3.Error as e:
             return []
 
     def edit_entry(self, entry_number, new_title=None, new_content=None):
         """Edit the title or content of an existing entry."""
+
+        def write(conn):
+            conn.execute('''
+                UPDATE journal_entries
+                SET title = ?, content = ?
+                WHERE user_id = ? AND number = ?
+            ''', (new_title, new_content, self.user_id, entry_number))
+
         try:
-            with self.conn:
-                self.conn.execute('''
-                    UPDATE journal_entries
-                    SET title = ?, content = ?
-                    WHERE number = ?
-                ''', (new_title, new_content, entry_number))
-            return f"Entry #{entry_number} updated successfully."
+            write_queue.run(self.conn, Journal.DB_FILE, write, self.bump_version)
+            return "Entry updated successfully."
         except sqlite3.Error as e:
             return f"Error updating entry: {e}"
 
     def delete_entry(self, entry_number):
-        """Delete an entry by its number."""
-        try:
-            with self.conn:
-                self.conn.execute('DELETE FROM journal_entries WHERE number = ?', (entry_number,))
-            self.renumber_entries()  # Renumber entries after deletion
-            return f"Entry #{entry_number} deleted successfully."
-        except sqlite3.Error as e:
-            return f"Error deleting entry: {e}"
+        """Delete an entry by its number.
+
+        Entry numbers are stable; the positions shown in the UI are derived at
+        read time, so no other row has to be rewritten.
+        """
+
+        def write(conn):
+            conn.execute('DELETE FROM journal_entries WHERE user_id = ? AND number = ?', (self.user_id, entry_number))
 
-    def renumber_entries(self):
-        """Renumber the entries after a deletion."""
         try:
-            entries = self.get_all_entries()
-            for index, entry in enumerate(entries):
-                new_number = index + 1
-                with self.conn:
-                    self.conn.execute('''
-                        UPDATE journal_entries
-                        SET number = ?
-                        WHERE id = ?
-                    ''', (new_number, entry[0]))  # entry[0] is the id
+            write_queue.run(self.conn, Journal.DB_FILE, write, self.bump_version)
+            return "Entry deleted successfully."
         except sqlite3.Error as e:
-            print(f"Error renumbering entries: {e}")
+            return f"Error deleting entry: {e}"
 
 
 class JournalApp(QMainWindow):
     TITLE_MAX_LENGTH = 50
 
-    def __init__(self):
+    def __init__(self, user_id=db.LOCAL_USER):
         super().__init__()
 
-        self.journal = Journal()
+        self.journal = Journal(user_id)
 
-        # Initialize pygame for playing music
-        pygame.mixer.init()
-        pygame.mixer.music.load("/Users/pedritos22/Desktop/relaxing_music.mp3")
-        pygame.mixer.music.set_volume(0.5)  
-        pygame.mixer.music.play(-1)  # Play the music indefinitely
+        # Relaxing music, loaded and played on its own thread once the window shows
+        self.music = audio.AudioService()
 
         # Windows Dimensions
         self.setWindowTitle("Journal Manager")
@@ -230,6 +262,33 @@ class JournalApp(QMainWindow):
         QMessageBox.information(self, "Entry Added", result)
         dialog.close()
 
+    def fill_entries_list(self, entries_list, format_entry):
+        """Fill a list widget page by page as the user scrolls down.
+
+        Only the first page is queried up front; each entry is stored on its
+        item under Qt.UserRole so selections don't need to re-query.
+        """
+        state = {"last_number": 0, "done": False}
+
+        def load_page():
+            if state["done"]:
+                return
+            entries = self.journal.get_entries_page(state["last_number"], Journal.PAGE_SIZE)
+            for position, entry in enumerate(entries, start=entries_list.count() + 1):
+                item = QListWidgetItem(format_entry(position, entry))
+                item.setData(Qt.UserRole, entry)
+                entries_list.addItem(item)
+            if entries:
+                state["last_number"] = entries[-1][1]
+            state["done"] = len(entries) < Journal.PAGE_SIZE
+
+        def on_scrolled(value):
+            if value == entries_list.verticalScrollBar().maximum():
+                load_page()
+
+        entries_list.verticalScrollBar().valueChanged.connect(on_scrolled)
+        load_page()
+
     def show_entries(self):
         """Show all journal entries in a new window."""
         entries_window = QDialog(self)
@@ -241,15 +300,12 @@ class JournalApp(QMainWindow):
         entries_list = QListWidget(entries_window)
         layout.addWidget(entries_list)
 
-        entries = self.journal.get_all_entries()
-
-        if not entries:
+        self.fill_entries_list(
+            entries_list,
+            lambda position, entry: f"Entry #{position}: {entry[2]} - {entry[3]} on {display_date(entry[4])}"
+        )
+        if entries_list.count() == 0:
             entries_list.addItem("No entries found.")
-        else:
-            for entry in entries:
-                entry_text = f"Entry #{entry[1]}: {entry[2]} - {entry[3]} on {entry[4]}"
-                item = QListWidgetItem(entry_text)
-                entries_list.addItem(item)
 
         close_button = QPushButton("Close", entries_window)
         close_button.clicked.connect(entries_window.close)
@@ -260,8 +316,7 @@ class JournalApp(QMainWindow):
 
     def select_entry_for_edit(self):
         """Show a dialog to select an entry for editing."""
-        entries = self.journal.get_all_entries()
-        if not entries:
+        if not self.journal.get_entries_page(limit=1):
             QMessageBox.warning(self, "No Entries", "No entries found to edit.")
             return
 
@@ -273,28 +328,26 @@ class JournalApp(QMainWindow):
 
         # List widget to display the entries
         entries_list = QListWidget(entry_selector)
-        for entry in entries:
-            entry_text = f"Entry #{entry[1]}: {entry[2]}"
-            item = QListWidgetItem(entry_text)
-            entries_list.addItem(item)
+        self.fill_entries_list(entries_list, lambda position, entry: f"Entry #{position}: {entry[2]}")
         layout.addWidget(entries_list)
 
         # Edit Selected Entry
         edit_button = QPushButton("Edit Selected Entry")
-        edit_button.clicked.connect(lambda: self.edit_entry(entries_list.currentRow(), entry_selector))
+        edit_button.clicked.connect(lambda: self.edit_entry(entries_list.currentRow(), entries_list.currentItem(), entry_selector))
         layout.addWidget(edit_button)
 
         entry_selector.setLayout(layout)
         entry_selector.exec_()
 
-    def edit_entry(self, index, dialog):
+    def edit_entry(self, index, item, dialog):
         """Edit the selected entry."""
-        entries = self.journal.get_all_entries()
-        selected_entry = entries[index]
+        if item is None:
+            return
+        selected_entry = item.data(Qt.UserRole)
         entry_number = selected_entry[1]
 
         edit_dialog = QDialog(self)
-        edit_dialog.setWindowTitle(f"Edit Entry #{entry_number}")
+        edit_dialog.setWindowTitle(f"Edit Entry #{index + 1}")
         edit_dialog.setGeometry(300, 200, 400, 300)
 
         layout = QVBoxLayout(edit_dialog)
@@ -335,8 +388,7 @@ class JournalApp(QMainWindow):
 
     def select_entry_for_deletion(self):
         """Show a dialog to select an entry for deletion."""
-        entries = self.journal.get_all_entries()
-        if not entries:
+        if not self.journal.get_entries_page(limit=1):
             QMessageBox.warning(self, "No Entries", "No entries found to delete.")
             return
 
@@ -348,30 +400,38 @@ class JournalApp(QMainWindow):
 
         # List widget to display the entries
         entries_list = QListWidget(entry_selector)
-        for entry in entries:
-            entry_text = f"Entry #{entry[1]}: {entry[2]}"
-            item = QListWidgetItem(entry_text)
-            entries_list.addItem(item)
+        self.fill_entries_list(entries_list, lambda position, entry: f"Entry #{position}: {entry[2]}")
         layout.addWidget(entries_list)
 
         # Button to delete the selected entry
         delete_button = QPushButton("Delete Selected Entry")
-        delete_button.clicked.connect(lambda: self.delete_entry(entries_list.currentRow(), entry_selector))
+        delete_button.clicked.connect(lambda: self.delete_entry(entries_list.currentItem(), entry_selector))
         layout.addWidget(delete_button)
 
         entry_selector.setLayout(layout)
         entry_selector.exec_()
 
-    def delete_entry(self, index, dialog):
+    def delete_entry(self, item, dialog):
         """Delete the selected entry."""
-        entries = self.journal.get_all_entries()
-        selected_entry = entries[index]
+        if item is None:
+            return
+        selected_entry = item.data(Qt.UserRole)
         entry_number = selected_entry[1]
 
         result = self.journal.delete_entry(entry_number)
         QMessageBox.information(self, "Entry Deletion", result)
         dialog.close()
 
+    def showEvent(self, event):
+        """Start the music when the window appears."""
+        self.music.start()
+        super().showEvent(event)
+
+    def closeEvent(self, event):
+        """Stop the music when the window closes."""
+        self.music.stop()
+        super().closeEvent(event)
+
 
 #Window app
 if __name__ == "__main__":
@@ -1,148 +1,387 @@
 import sys
 import sqlite3
 import time
-import pygame
+from bisect import bisect_left
+from collections import OrderedDict
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QPushButton, QLabel, QMessageBox,
-    QWidget, QDialog, QListWidget, QListWidgetItem, QTextEdit, QComboBox
+    QWidget, QDialog, QListView, QListWidget, QListWidgetItem, QTextEdit, QComboBox, QLineEdit,
+    QTableWidget, QTableWidgetItem
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
 from PyQt5.QtGui import QFont
 
+import audio
+import data_version
+import db
+import migrations
+import write_queue
+from mood_stats import MoodStats
+
+
+def display_date(value):
+    # Render a stored ISO-8601 timestamp as "YYYY-MM-DD HH:MM" for the UI.
+    return (value or "").replace("T", " ")[:16]
 
-class Journal:
-    DB_FILE = 'journal.db'
 
-    def __init__(self):
+class Journal:
+    DB_FILE = db.JOURNAL_DB
+    PAGE_SIZE = 100
+    DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"  # ISO-8601, sorts and range-scans as plain text
+    ENTRY_CACHE_SIZE = 32  # Number of recently opened entries kept in memory
+
+    # Recently opened entries of every Journal in this process, keyed by
+    # (user_id, number) and valid for one data version of journal_entries
+    entry_cache = OrderedDict()
+    entry_cache_version = None
+
+    # Change events passed to listeners together with the affected entry number
+    ENTRY_INSERTED = "inserted"
+    ENTRY_UPDATED = "updated"
+    ENTRY_DELETED = "deleted"
+
+    def __init__(self, user_id=db.LOCAL_USER):
+        self.user_id = user_id  # Only this user's entries are read and written
         self.conn = self.create_connection()
-        self.create_table()
+        self.mood_stats = MoodStats(self.conn, 'journal_entries', user_id)
+        db.init_schema(Journal.DB_FILE, 'journal', lambda: migrations.migrate(Journal.DB_FILE))
+        self.listeners = []
+
+    def add_listener(self, listener):
+        # Register a callable(event, entry_number) to be told about every change
+        # made through this Journal.
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def notify(self, event, entry_number):
+        for listener in list(self.listeners):
+            listener(event, entry_number)
 
     def create_connection(self):
-        # Create a database connection.
+        # Get this thread's shared connection to the journal database.
         try:
-            return sqlite3.connect(Journal.DB_FILE)
+            return db.get_connection(Journal.DB_FILE)
         except sqlite3.Error as e:
             print(f"Error connecting to database: {e}")
         return None
 
-    def create_table(self):
-        # Create the journal_entries table if it doesn't exist.
+    def bump_version(self):
+        # Mark the entries as changed for HTTP caches; see data_version.py.
+        data_version.bump(Journal.DB_FILE, 'journal_entries')
+
+    def add_new_entry(self, title, content, mood):
+        # Add a new journal entry. The number (counted per user) is allocated
+        # inside the INSERT itself, so concurrent writers can never be handed the same one.
+        entry_date = time.strftime(Journal.DATE_FORMAT, time.localtime())
+
+        def write(conn):
+            cursor = conn.execute('''
+                INSERT INTO journal_entries (user_id, number, title, content, mood, date)
+                SELECT ?, COALESCE(MAX(number), 0) + 1, ?, ?, ?, ?
+                FROM journal_entries
+                WHERE user_id = ?
+                RETURNING number
+            ''', (self.user_id, title, content, mood, entry_date, self.user_id))
+            return cursor.fetchone()[0]
+
         try:
-            with self.conn:
-                self.conn.execute('''
-                    CREATE TABLE IF NOT EXISTS journal_entries (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        number INTEGER,
-                        title TEXT,
-                        content TEXT,
-                        mood TEXT,
-                        date TEXT
-                    )
-                ''')
+            entry_number = write_queue.run(self.conn, Journal.DB_FILE, write, self.bump_version)
         except sqlite3.Error as e:
-            print(f"Error creating table: {e}")
+            return f"Error saving entry to the database: {e}"
+        if entry_number is not None:  # None when the write was queued asynchronously
+            self.notify(Journal.ENTRY_INSERTED, entry_number)
+        return "Entry added successfully."
 
-    def add_new_entry(self, title, content, mood):
-        # Add a new journal entry.
-        entry_date = time.strftime("%d-%m-%Y", time.localtime())
-        entry_number = self.get_next_entry_number()
-
-        if entry_number:
-            try:
-                with self.conn:
-                    self.conn.execute('''
-                        INSERT INTO journal_entries (number, title, content, mood, date)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (entry_number, title, content, mood, entry_date))
-                return f"Entry #{entry_number} added successfully."
-            except sqlite3.Error as e:
-                return f"Error saving entry to the database: {e}"
-        else:
-            return "Failed to determine next entry number."
-
-    def get_next_entry_number(self):
-        # Get the next available entry number from the database.
+    def get_all_entries(self):
+        # Get all journal entries. Prefer iter_entries() or get_entries_page()
+        # for anything that only needs to walk or display the journal.
+        return list(self.iter_entries())
+
+    def get_entries_page(self, after_number=0, limit=PAGE_SIZE):
+        # Get up to `limit` entries numbered after `after_number`, as (id, number,
+        # title, content, mood, date). Seeks on the (user, number) index, so the
+        # cost depends on the page size, not the journal size or the number of users.
         try:
             cursor = self.conn.cursor()
-            cursor.execute('SELECT MAX(number) FROM journal_entries')
-            result = cursor.fetchone()
-            return (result[0] or 0) + 1
+            cursor.execute('''
+                SELECT id, number, title, content, mood, date FROM journal_entries
+                WHERE user_id = ? AND number > ?
+                ORDER BY number
+                LIMIT ?
+            ''', (self.user_id, after_number, limit))
+            return cursor.fetchall()
         except sqlite3.Error as e:
-            print(f"Error retrieving entry count: {e}")
-            return None
+            return []
 
-    def get_all_entries(self):
-        # Get all journal entries.
+    def iter_entries(self, chunk_size=PAGE_SIZE):
+        # Yield every entry in number order, fetching one page at a time.
+        after_number = 0
+        while True:
+            page = self.get_entries_page(after_number, chunk_size)
+            yield from page
+            if len(page) < chunk_size:
+                return
+            after_number = page[-1][1]
+
+    def get_entries_between(self, start, end):
+        # Get the entries written in [start, end), oldest first. `start` and `end`
+        # are dates, datetimes or ISO-8601 strings; a plain date as `end` means
+        # "before that day". Uses the (user, date) index.
+        start = start.isoformat() if hasattr(start, 'isoformat') else start
+        end = end.isoformat() if hasattr(end, 'isoformat') else end
         try:
             cursor = self.conn.cursor()
-            cursor.execute('SELECT * FROM journal_entries ORDER BY number')
-            rows = cursor.fetchall()
-            return rows
+            cursor.execute('''
+                SELECT id, number, title, content, mood, date FROM journal_entries
+                WHERE user_id = ? AND date >= ? AND date < ?
+                ORDER BY date, number
+            ''', (self.user_id, start, end))
+            return cursor.fetchall()
         except sqlite3.Error as e:
             return []
 
-    def get_entry_by_number(self, entry_number):
-        # Get a specific journal entry by its number.
+    def get_entry_summaries_page(self, after_number=0, limit=PAGE_SIZE):
+        # Like get_entries_page() but without the content column, for list views.
+        # Rows are (id, number, title, mood, date).
         try:
             cursor = self.conn.cursor()
-            cursor.execute('SELECT * FROM journal_entries WHERE number = ?', (entry_number,))
+            cursor.execute('''
+                SELECT id, number, title, mood, date FROM journal_entries
+                WHERE user_id = ? AND number > ?
+                ORDER BY number
+                LIMIT ?
+            ''', (self.user_id, after_number, limit))
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            return []
+
+    def search(self, query, limit=20):
+        # Full-text search over titles and content, best matches first. Rows are
+        # (id, number, title, mood, date, snippet) with matches in [brackets].
+        # Every word of the query must appear; the last one may be a prefix.
+        terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+        if not terms:
+            return []
+        terms[-1] += '*'
+        # The index has the user's id as a column; matching it keeps the
+        # search to this user's entries (see migrations.user_search_index)
+        match = f'user_id:"{int(self.user_id)}" AND {{title content}}: ({" ".join(terms)})'
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                SELECT e.id, e.number, e.title, e.mood, e.date,
+                       snippet(journal_entries_fts, -1, '[', ']', '...', 12)
+                FROM journal_entries_fts
+                JOIN journal_entries e ON e.id = journal_entries_fts.rowid
+                WHERE journal_entries_fts MATCH ?
+                ORDER BY rank
+                LIMIT ?
+            ''', (match, limit))
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            return []
+
+    def get_entry_position(self, entry_number):
+        # 1-based position of an entry in the list, counted on the (user, number) index.
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                'SELECT COUNT(*) FROM journal_entries WHERE user_id = ? AND number <= ?', (self.user_id, entry_number)
+            )
+            return cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            return None
+
+    def get_entry_summary(self, entry_number):
+        # Get the (id, number, title, mood, date) summary of a single entry.
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                'SELECT id, number, title, mood, date FROM journal_entries WHERE user_id = ? AND number = ?',
+                (self.user_id, entry_number)
+            )
             return cursor.fetchone()
         except sqlite3.Error as e:
             return None
 
+    def cached_entries(self):
+        # The shared entry cache, emptied first if journal_entries has changed
+        # since it was filled, through any Journal or any other process (the
+        # version is a stat() of the marker file, see data_version.py)
+        current = data_version.version(Journal.DB_FILE, 'journal_entries').ns
+        if current != Journal.entry_cache_version:
+            Journal.entry_cache.clear()
+            Journal.entry_cache_version = current
+        return Journal.entry_cache
+
+    def get_entry_by_number(self, entry_number):
+        # Get a specific journal entry by its number. Recently opened entries
+        # are served from a small LRU cache.
+        cache = self.cached_entries()
+        key = (self.user_id, entry_number)
+        entry = cache.get(key)
+        if entry is not None:
+            cache.move_to_end(key)
+            return entry
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                'SELECT id, number, title, content, mood, date FROM journal_entries WHERE user_id = ? AND number = ?',
+                (self.user_id, entry_number)
+            )
+            entry = cursor.fetchone()
+        except sqlite3.Error as e:
+            return None
+        if entry is not None:
+            cache[key] = entry
+            if len(cache) > Journal.ENTRY_CACHE_SIZE:
+                cache.popitem(last=False)
+        return entry
+
     def edit_entry(self, entry_number, new_title=None, new_content=None, new_mood=None):
-        # Edit the title, content, or mood of an existing entry.
+        # Edit the title, content, or mood of an existing entry. Fields left as
+        # None keep their current value.
+        Journal.entry_cache.pop((self.user_id, entry_number), None)
+
+        def write(conn):
+            conn.execute('''
+                UPDATE journal_entries
+                SET title = COALESCE(?, title), content = COALESCE(?, content), mood = COALESCE(?, mood)
+                WHERE user_id = ? AND number = ?
+            ''', (new_title, new_content, new_mood, self.user_id, entry_number))
+            return True
+
         try:
-            with self.conn:
-                self.conn.execute('''
-                    UPDATE journal_entries
-                    SET title = ?, content = ?, mood = ?
-                    WHERE number = ?
-                ''', (new_title, new_content, new_mood, entry_number))
-            return f"Entry #{entry_number} updated successfully."
+            written = write_queue.run(self.conn, Journal.DB_FILE, write, self.bump_version)
         except sqlite3.Error as e:
             return f"Error updating entry: {e}"
+        if written:
+            self.notify(Journal.ENTRY_UPDATED, entry_number)
+        return "Entry updated successfully."
 
     def delete_entry(self, entry_number):
-        # Delete an entry by its number.
+        # Delete an entry by its number. Display positions are derived at read
+        # time, so the remaining rows are left untouched.
+        Journal.entry_cache.pop((self.user_id, entry_number), None)
+
+        def write(conn):
+            conn.execute('DELETE FROM journal_entries WHERE user_id = ? AND number = ?', (self.user_id, entry_number))
+            return True
+
         try:
-            with self.conn:
-                self.conn.execute('DELETE FROM journal_entries WHERE number = ?', (entry_number,))
-            self.renumber_entries()  # Renumber entries after deletion
-            return f"Entry #{entry_number} deleted successfully."
+            written = write_queue.run(self.conn, Journal.DB_FILE, write, self.bump_version)
         except sqlite3.Error as e:
             return f"Error deleting entry: {e}"
+        if written:
+            self.notify(Journal.ENTRY_DELETED, entry_number)
+        return "Entry deleted successfully."
 
-    def renumber_entries(self):
-        # Renumber the entries after a deletion.
-        try:
-            entries = self.get_all_entries()
-            for index, entry in enumerate(entries):
-                new_number = index + 1
-                with self.conn:
-                    self.conn.execute('''
-                        UPDATE journal_entries
-                        SET number = ?
-                        WHERE id = ?
-                    ''', (new_number, entry[0]))  # entry[0] is the id
-        except sqlite3.Error as e:
-            print(f"Error renumbering entries: {e}")
+
+class EntryListModel(QAbstractListModel):
+    # List model over the journal's entry summaries. Pages are fetched from the
+    # database only as the view scrolls towards them, and the display text is
+    # built only for the rows the view actually paints.
+
+    def __init__(self, journal, parent=None):
+        super().__init__(parent)
+        self.journal = journal
+        self.entries = []
+        self.numbers = []  # Entry numbers of self.entries, kept sorted for bisecting
+        self.all_entries_loaded = False
+        self.journal.add_listener(self.on_journal_changed)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.DisplayRole:
+            # Positions are derived from the row rather than stored, so deletes never renumber rows
+            return f"Entry #{index.row() + 1}: {entry[2]} - Mood: {entry[3]} (Date: {display_date(entry[4])})"
+        if role == Qt.UserRole:
+            return entry[1]  # Only the number; the body is loaded on open
+        return None
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self.all_entries_loaded
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        last_number = self.entries[-1][1] if self.entries else 0
+        page = self.journal.get_entry_summaries_page(last_number, Journal.PAGE_SIZE)
+        if page:
+            first_row = len(self.entries)
+            self.beginInsertRows(QModelIndex(), first_row, first_row + len(page) - 1)
+            self.entries.extend(page)
+            self.numbers.extend(entry[1] for entry in page)
+            self.endInsertRows()
+        self.all_entries_loaded = len(page) < Journal.PAGE_SIZE
+
+    def reload(self):
+        # Drop everything fetched so far; the view asks for the first page again.
+        self.beginResetModel()
+        self.entries = []
+        self.numbers = []
+        self.all_entries_loaded = False
+        self.endResetModel()
+
+    def find_row(self, entry_number):
+        # Row of a loaded entry, or None if it hasn't been fetched.
+        row = bisect_left(self.numbers, entry_number)
+        if row < len(self.numbers) and self.numbers[row] == entry_number:
+            return row
+        return None
+
+    def on_journal_changed(self, event, entry_number):
+        # Apply a single change from the journal without re-reading the list.
+        if event == Journal.ENTRY_INSERTED:
+            # New entries always sort last; if the tail hasn't been fetched yet
+            # fetchMore will pick this one up with the rest.
+            if not self.all_entries_loaded:
+                return
+            summary = self.journal.get_entry_summary(entry_number)
+            if summary is None:
+                return
+            row = len(self.entries)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.entries.append(summary)
+            self.numbers.append(entry_number)
+            self.endInsertRows()
+            return
+
+        row = self.find_row(entry_number)
+        if row is None:
+            return
+        if event == Journal.ENTRY_UPDATED:
+            summary = self.journal.get_entry_summary(entry_number)
+            if summary is not None:
+                self.entries[row] = summary
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+        elif event == Journal.ENTRY_DELETED:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.entries[row]
+            del self.numbers[row]
+            self.endRemoveRows()
 
 
 class JournalApp(QMainWindow):
     TITLE_MAX_LENGTH = 50
     MOODS = ["Happy", "Sad", "Relaxed", "Angry", "Excited", "Anxious", "Bored", "Grateful"]  # List of moods
+    MOOD_TREND_WEEKS = 12  # How far back the mood trends dialog looks
 
-    def __init__(self):
+    def __init__(self, user_id=db.LOCAL_USER):
         super().__init__()
 
-        self.journal = Journal()
+        self.journal = Journal(user_id)
 
-        # Initialize pygame for playing music
-        pygame.mixer.init()
-        pygame.mixer.music.load("/Users/pedritos22/Desktop/relaxing_music.mp3")  # Load your relaxing music file here
-        pygame.mixer.music.set_volume(0.5)  # Set volume (0.0 to 1.0)
-        pygame.mixer.music.play(-1)  # Play the music indefinitely
+        # Relaxing music, loaded and played on its own thread once the window shows
+        self.music = audio.AudioService()
 
         # Set window title and dimensions
         self.setWindowTitle("Journal Manager")
@@ -169,28 +408,41 @@ class JournalApp(QMainWindow):
         self.add_entry_btn.clicked.connect(self.add_entry)
         self.main_layout.addWidget(self.add_entry_btn)
 
+        # Mood Trends Button
+        self.mood_trends_btn = QPushButton("Mood Trends", self)
+        self.mood_trends_btn.setFont(QFont("Arial", 16))
+        self.mood_trends_btn.setStyleSheet(
+            "background-color: #8E44AD; color: white; border: 1px solid #7D3C98; border-radius: 10px;"
+        )
+        self.mood_trends_btn.clicked.connect(self.show_mood_trends)
+        self.main_layout.addWidget(self.mood_trends_btn)
+
         # Footer Label
         self.footer_label = QLabel("Yournal™", self)
         self.footer_label.setAlignment(Qt.AlignCenter)
         self.footer_label.setStyleSheet("color: #AAB8C2; font-size: 14px;")
         self.main_layout.addWidget(self.footer_label)
 
+        # Search Box
+        self.search_edit = QLineEdit(self)
+        self.search_edit.setPlaceholderText("Search entries...")
+        self.search_edit.returnPressed.connect(self.search_entries)
+        self.main_layout.addWidget(self.search_edit)
+
         # Journal Entries List
-        self.entry_list = QListWidget()
-        self.entry_list.itemClicked.connect(self.show_entry_details)  # Show entry details on click
+        self.entry_model = EntryListModel(self.journal, self)
+        self.entry_list = QListView()
+        self.entry_list.setUniformItemSizes(True)  # Lets the view skip measuring every row
+        self.entry_list.setModel(self.entry_model)
+        self.entry_list.clicked.connect(self.show_entry_details)  # Show entry details on click
         self.main_layout.addWidget(self.entry_list)
 
         # Load entries on startup
         self.load_entries()
 
     def load_entries(self):
-        # Load all entries into the list widget.
-        self.entry_list.clear()  # Clear the current list
-        entries = self.journal.get_all_entries()
-        for entry in entries:
-            item = QListWidgetItem(f"Entry #{entry[1]}: {entry[2]} - Mood: {entry[4]} (Date: {entry[5]})")
-            item.setData(Qt.UserRole, entry)  # Store the entire entry for later use
-            self.entry_list.addItem(item)
+        # Reload the entry list; the model fetches pages as they scroll into view.
+        self.entry_model.reload()
 
     def add_entry(self):
         # Show a dialog to add a new journal entry.
@@ -231,18 +483,84 @@ class JournalApp(QMainWindow):
         mood = mood_combo.currentText()
         result = self.journal.add_new_entry(title, content, mood)
         QMessageBox.information(self, "Entry Status", result)
-        self.load_entries()  # Refresh the entry list after adding
 
-    def show_entry_details(self, item):
+    def show_mood_trends(self):
+        # Show weekly mood counts for the last few months, read from the
+        # pre-aggregated counts rather than the entries.
+        weeks = JournalApp.MOOD_TREND_WEEKS
+        since = time.strftime("%Y-%m-%d", time.localtime(time.time() - weeks * 7 * 24 * 3600))
+        trend = self.journal.mood_stats.get_trend('week', window=4, start=since)
+        if not trend['buckets']:
+            QMessageBox.information(self, "Mood Trends", f"No moods recorded in the last {weeks} weeks.")
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Mood Trends")
+        dialog.setGeometry(300, 200, 700, 400)
+
+        layout = QVBoxLayout(dialog)
+
+        # Mood share over the most recent four weeks
+        latest_share = trend['rolling_share'][-1]
+        summary = ", ".join(
+            f"{mood} {share:.0%}" for mood, share in sorted(zip(trend['moods'], latest_share), key=lambda pair: -pair[1])
+            if share > 0
+        )
+        layout.addWidget(QLabel(f"Last 4 weeks: {summary}"))
+
+        # Weekly counts, newest week first
+        table = QTableWidget(len(trend['buckets']), len(trend['moods']), dialog)
+        table.setHorizontalHeaderLabels(trend['moods'])
+        table.setVerticalHeaderLabels([f"Week of {bucket}" for bucket in reversed(trend['buckets'])])
+        for row, counts in enumerate(reversed(trend['counts'])):
+            for column, count in enumerate(counts):
+                table.setItem(row, column, QTableWidgetItem(str(count)))
+        layout.addWidget(table)
+
+        dialog.exec_()
+
+    def search_entries(self):
+        # Show the best matches for the search box text in a dialog.
+        query = self.search_edit.text().strip()
+        if not query:
+            return
+        hits = self.journal.search(query)
+        if not hits:
+            QMessageBox.information(self, "Search", f"No entries match '{query}'.")
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"Search: {query}")
+        dialog.setGeometry(300, 200, 500, 400)
+
+        layout = QVBoxLayout(dialog)
+
+        results_list = QListWidget(dialog)
+        for hit in hits:
+            item = QListWidgetItem(f"{hit[2]} - Mood: {hit[3]} (Date: {display_date(hit[4])})\n{hit[5]}")
+            item.setData(Qt.UserRole, hit[1])
+            results_list.addItem(item)
+        results_list.itemClicked.connect(lambda item: self.show_search_hit(item.data(Qt.UserRole)))
+        layout.addWidget(results_list)
+
+        dialog.exec_()
+
+    def show_search_hit(self, entry_number):
+        # Open an entry picked from the search results.
+        entry = self.journal.get_entry_by_number(entry_number)
+        if entry:
+            self.show_entry_dialog(entry, self.journal.get_entry_position(entry_number))
+
+    def show_entry_details(self, index):
         # Show the details of the clicked entry.
-        entry = item.data(Qt.UserRole)  # Get the full entry data
+        entry = self.journal.get_entry_by_number(index.data(Qt.UserRole))
         if entry:
-            self.show_entry_dialog(entry)
+            self.show_entry_dialog(entry, index.row() + 1)
 
-    def show_entry_dialog(self, entry):
+    def show_entry_dialog(self, entry, position):
         # Show a dialog for viewing or editing the entry.
         dialog = QDialog(self)
-        dialog.setWindowTitle(f"Entry #{entry[1]}")
+        dialog.setWindowTitle(f"Entry #{position}")
         dialog.setGeometry(300, 200, 400, 400)
 
         layout = QVBoxLayout(dialog)
@@ -281,14 +599,22 @@ class JournalApp(QMainWindow):
         result = self.journal.edit_entry(entry_number, new_content=new_content, new_mood=new_mood)
         QMessageBox.information(self, "Entry Status", result)
         dialog.accept()  # Close the dialog
-        self.load_entries()  # Refresh the entry list after editing
 
     def delete_entry(self, entry_number, dialog):
         # Delete the specified journal entry.
         result = self.journal.delete_entry(entry_number)
         QMessageBox.information(self, "Entry Status", result)
         dialog.accept()  # Close the dialog
-        self.load_entries()  # Refresh the entry list after deletion
+
+    def showEvent(self, event):
+        # Start the music when the window appears.
+        self.music.start()
+        super().showEvent(event)
+
+    def closeEvent(self, event):
+        # Stop the music when the window closes.
+        self.music.stop()
+        super().closeEvent(event)
 
 
 if __name__ == "__main__":
@@ -1,19 +1,57 @@
+import os
 import sqlite3
-from cryptography.fernet import Fernet
+import sys
 import tkinter as tk
 from tkinter import messagebox
 
-# Stały klucz do szyfrowania i deszyfrowania
-KEY = b'G1uOU6RQF_8jEBb-uDd9grbU8SPhXZcWxv1Whtw3PpA='  # Stały klucz
+import sessions
+import users
 
-# Obiekt Fernet do szyfrowania i deszyfrowania haseł
-cipher = Fernet(KEY)
+# Program We_Move (MergeAll.py) leży w katalogu nadrzędnym
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Obiekt Fernet do szyfrowania haseł (zob. users.py)
+from users import cipher
 
-# Nazwa lokalnej bazy danych SQLite
-DATABASE_NAME = "users.db"
+# Lokalna baza danych SQLite (users.db obok tego pliku)
+DATABASE_NAME = users.USERS_DB
 
-# Zmienna globalna przechowująca nazwę aktualnie zalogowanego użytkownika
-logged_in_user = None
+# Token sesji zalogowanego użytkownika (zob. sessions.py)
+session_token = None
+
+# Program We_Move (MergeAll.MainApp) otwarty dla zalogowanego użytkownika
+launcher = None
+
+
+def current_user():
+    """Nazwa aktualnie zalogowanego użytkownika albo None."""
+    return sessions.default_manager().user(session_token)
+
+
+def current_user_id():
+    """Id aktualnie zalogowanego użytkownika (dla Journal/TaskList) albo None."""
+    session = sessions.default_manager().lookup(session_token)
+    return None if session is None else session.user_id
+
+
+def open_launcher():
+    """Otwiera program We_Move z dziennikiem i zadaniami zalogowanego użytkownika."""
+    global launcher
+    user_id = current_user_id()
+    if user_id is None:
+        messagebox.showwarning("Brak zalogowanego użytkownika", "Najpierw się zaloguj.")
+        return
+    close_launcher()
+    # Import dopiero tutaj: samo logowanie nie potrzebuje PyQt5 ani reszty programu
+    import MergeAll
+    launcher = MergeAll.MainApp(tk.Toplevel(root), user_id)
+
+
+def close_launcher():
+    """Zamyka program We_Move otwarty dla poprzednio zalogowanego użytkownika."""
+    global launcher
+    if launcher is not None and launcher.master.winfo_exists():
+        launcher.master.destroy()
+    launcher = None
 
 
 def connect_to_db(database_name):
@@ -27,70 +65,40 @@ def connect_to_db(database_name):
 
 def register_user(username, password):
     """Funkcja rejestrująca nowego użytkownika z szyfrowaniem hasła."""
-    conn = connect_to_db(DATABASE_NAME)
-    if not conn:
-        return False
-
-    cursor = conn.cursor()
-    
-    # Tworzenie tabeli, jeśli nie istnieje
-    cursor.execute("""CREATE TABLE IF NOT EXISTS users (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        username TEXT NOT NULL UNIQUE,
-                        password BLOB NOT NULL
-                    );""")
-
-    # Sprawdzanie, czy użytkownik już istnieje
     try:
-        cursor.execute("SELECT username FROM users WHERE username = ?", (username,))
-        if cursor.fetchone():
-            messagebox.showerror("Błąd", f"Użytkownik '{username}' już istnieje.")
-            return False
+        # Sprawdzenie, szyfrowanie i zapis (zob. users.provision_users)
+        result = users.provision_users([(username, password)], DATABASE_NAME, processes=0)
     except Exception as e:
-        messagebox.showerror("Błąd", f"Błąd przy sprawdzaniu użytkownika: {e}")
+        messagebox.showerror("Błąd", f"Błąd przy rejestracji: {e}")
         return False
 
-    # Szyfrowanie hasła
-    encrypted_password = cipher.encrypt(password.encode())
-
-    try:
-        # Wstawianie nowego użytkownika
-        cursor.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, encrypted_password))
-        conn.commit()
+    if result.created:
         messagebox.showinfo("Sukces", f"Użytkownik {username} został zarejestrowany.")
         return True
-    except Exception as e:
-        messagebox.showerror("Błąd", f"Błąd przy rejestracji: {e}")
-        return False
-    finally:
-        cursor.close()
-        conn.close()
+    if result.conflicts and result.conflicts[0][1] == users.EXISTS:
+        messagebox.showerror("Błąd", f"Użytkownik '{username}' już istnieje.")
+    else:
+        messagebox.showwarning("Błąd", "Proszę podać zarówno nazwę użytkownika, jak i hasło.")
+    return False
 
 
 def login_user(username, password):
-    # Funkcja logowania użytkownika z odszyfrowaniem hasła.
-    global logged_in_user
+    # Funkcja logowania użytkownika: jedno sprawdzenie hasła, potem token sesji.
+    global session_token
     conn = connect_to_db(DATABASE_NAME)
     if not conn:
         return False
 
-    cursor = conn.cursor()
-
     try:
-        # Pobieranie hasła dla danego użytkownika
-        cursor.execute("SELECT password FROM users WHERE username = ?", (username,))
-        result = cursor.fetchone()
-        if result:
-            encrypted_password = result[0]
-            # Deszyfrowanie hasła
-            decrypted_password = cipher.decrypt(encrypted_password).decode()
-            if decrypted_password == password:
-                messagebox.showinfo("Sukces", "Zalogowano pomyślnie!")
-                logged_in_user = username  # Zapisanie nazwy zalogowanego użytkownika
-                return True
-            else:
-                messagebox.showerror("Błąd", "Niepoprawne hasło.")
-                return False
+        # Pobieranie i odszyfrowanie hasła dla danego użytkownika
+        result = users.check_password(conn, username, password)
+        if result == users.OK:
+            session_token = sessions.default_manager().issue(users.find_user_id(conn, username), username)
+            messagebox.showinfo("Sukces", "Zalogowano pomyślnie!")
+            return True
+        elif result == users.WRONG_PASSWORD:
+            messagebox.showerror("Błąd", "Niepoprawne hasło.")
+            return False
         else:
             messagebox.showerror("Błąd", "Użytkownik nie istnieje.")
             return False
@@ -98,48 +106,94 @@ def login_user(username, password):
         messagebox.showerror("Błąd", f"Błąd przy logowaniu: {e}")
         return False
     finally:
-        cursor.close()
         conn.close()
 
 
 def logout_user():
     # Funkcja wylogowująca aktualnie zalogowanego użytkownika.
-    global logged_in_user
-    if logged_in_user:
-        messagebox.showinfo("Wylogowanie", f"Wylogowano użytkownika: {logged_in_user}")
-        logged_in_user = None
+    global session_token
+    username = current_user()
+    close_launcher()  # Dane wylogowanego użytkownika nie zostają na ekranie
+    if username:
+        sessions.default_manager().revoke(session_token)
+        session_token = None
+        messagebox.showinfo("Wylogowanie", f"Wylogowano użytkownika: {username}")
     else:
+        session_token = None
         messagebox.showwarning("Brak zalogowanego użytkownika", "Nikt nie jest zalogowany.")
 
 
 def show_registered_users():
-    # Funkcja wyświetlająca zarejestrowanych użytkowników oraz ich haseł.
+    # Okno z listą zarejestrowanych użytkowników: wyszukiwanie po początku
+    # nazwy i stronicowanie po users.PAGE_SIZE (zob. users.list_users).
     conn = connect_to_db(DATABASE_NAME)
     if not conn:
         return
 
-    cursor = conn.cursor()
-
-    try:
-        # Pobieranie wszystkich użytkowników z bazy danych
-        cursor.execute("SELECT username, password FROM users")
-        users = cursor.fetchall()
-
-        if users:
-            user_list = "Lista zarejestrowanych użytkowników:\n\n"
-            user_list += "{:<20} | {:<}\n".format("Nazwa użytkownika", "Zaszyfrowane hasło")
-            user_list += "-" * 70 + "\n"
-            for user in users:
-                username, encrypted_password = user
-                user_list += f"{username:<20} | {encrypted_password}\n"
-            messagebox.showinfo("Zarejestrowani użytkownicy", user_list)
-        else:
-            messagebox.showinfo("Brak użytkowników", "Brak zarejestrowanych użytkowników.")
-    except Exception as e:
-        messagebox.showerror("Błąd", f"Błąd przy wyświetlaniu użytkowników: {e}")
-    finally:
-        cursor.close()
-        conn.close()
+    window = tk.Toplevel(root)
+    window.title("Zarejestrowani użytkownicy")
+    window.geometry("400x500")
+    window.configure(bg="#f0f0f0")
+
+    search = tk.StringVar()
+    tk.Label(window, text="Szukaj (początek nazwy):", bg="#f0f0f0", font=("Arial", 10)).pack(pady=(10, 0))
+    entry_search = tk.Entry(window, textvariable=search, font=("Arial", 10))
+    entry_search.pack(pady=5)
+
+    listbox = tk.Listbox(window, font=("Courier", 10), width=40, height=20)
+    listbox.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+
+    status = tk.Label(window, bg="#f0f0f0", font=("Arial", 9))
+    status.pack()
+
+    buttons = tk.Frame(window, bg="#f0f0f0")
+    buttons.pack(pady=10)
+
+    # Ostatnie nazwy poprzednich stron (None dla pierwszej) i bieżąca strona
+    state = {'starts': [None], 'page': []}
+
+    def load_page():
+        try:
+            state['page'] = users.list_users(conn, search.get(), state['starts'][-1])
+        except sqlite3.Error as e:
+            messagebox.showerror("Błąd", f"Błąd przy wyświetlaniu użytkowników: {e}", parent=window)
+            return
+        listbox.delete(0, tk.END)
+        for user_id, username in state['page']:
+            listbox.insert(tk.END, f"{user_id:>7}  {username}")
+        if not state['page'] and len(state['starts']) == 1:
+            listbox.insert(tk.END, "Brak zarejestrowanych użytkowników.")
+        status.config(text=f"Strona {len(state['starts'])}")
+        btn_previous.config(state=tk.NORMAL if len(state['starts']) > 1 else tk.DISABLED)
+        btn_next.config(state=tk.NORMAL if len(state['page']) == users.PAGE_SIZE else tk.DISABLED)
+
+    def next_page():
+        state['starts'].append(state['page'][-1][1])
+        load_page()
+
+    def previous_page():
+        state['starts'].pop()
+        load_page()
+
+    def new_search(*_):
+        state['starts'] = [None]
+        load_page()
+
+    def on_destroy(event):
+        # Połączenie zamykane przy każdym zniszczeniu okna (przycisk, krzyżyk, zamknięcie programu)
+        if event.widget is window:
+            conn.close()
+
+    btn_previous = tk.Button(buttons, text="Poprzednia strona", command=previous_page, bg="#4CAF50", fg="white", font=("Arial", 10, 'bold'), relief=tk.FLAT)
+    btn_previous.grid(row=0, column=0, padx=5)
+    btn_next = tk.Button(buttons, text="Następna strona", command=next_page, bg="#4CAF50", fg="white", font=("Arial", 10, 'bold'), relief=tk.FLAT)
+    btn_next.grid(row=0, column=1, padx=5)
+    tk.Button(buttons, text="Zamknij", command=window.destroy, bg="#FF5722", fg="white", font=("Arial", 10, 'bold'), relief=tk.FLAT).grid(row=0, column=2, padx=5)
+
+    search.trace_add('write', new_search)
+    window.bind('<Destroy>', on_destroy)
+    load_page()
+    entry_search.focus_set()
 
 
 def show_main_menu():
@@ -156,6 +210,9 @@ def show_main_menu():
     btn_login = tk.Button(root, text="Logowanie", command=show_login_window, bg="#4CAF50", fg="white", font=("Arial", 10, 'bold'), width=button_width, relief=tk.FLAT)
     btn_login.pack(pady=10)
 
+    btn_launcher = tk.Button(root, text="Otwórz We_Move", command=open_launcher, bg="#4CAF50", fg="white", font=("Arial", 10, 'bold'), width=button_width, relief=tk.FLAT)
+    btn_launcher.pack(pady=10)
+
     btn_logout = tk.Button(root, text="Wylogowanie", command=logout_user, bg="#4CAF50", fg="white", font=("Arial", 10, 'bold'), width=button_width, relief=tk.FLAT)
     btn_logout.pack(pady=10)
 
@@ -232,6 +289,7 @@ def on_login(username, password):
     if username and password:
         if login_user(username, password):
             show_main_menu()  # Powrót do głównego menu po zalogowaniu
+            open_launcher()  # We_Move z danymi zalogowanego użytkownika
         else:
             messagebox.showwarning("Błąd", "Proszę sprawdzić nazwę użytkownika i hasło.")
     else:
@@ -239,9 +297,11 @@ def on_login(username, password):
 
 
 def clear_window():
-    # Funkcja czyszcząca zawartość okna.
+    # Funkcja czyszcząca zawartość okna. Osobne okna (We_Move, lista
+    # użytkowników) to Toplevel i zostają otwarte.
     for widget in root.winfo_children():
-        widget.destroy()
+        if not isinstance(widget, tk.Toplevel):
+            widget.destroy()
 
 
 def main():
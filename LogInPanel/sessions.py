@@ -0,0 +1,226 @@
+"""Login sessions: a token per successful login, checked without the users table.
+
+After one credential check, SessionManager.issue() hands out a random token.
+Every later request authenticates with lookup(token), a single dict lookup
+giving the user's id and name; neither the users table nor Fernet is touched
+again until the session ends.
+
+Sessions last `ttl` seconds. Their expiry times sit on a timer wheel of
+`slots` one-`tick` buckets, so expiring them costs time proportional to the
+sessions that actually end, never a scan of all of them. The wheel is advanced
+on every call; a token is also checked against its own expiry time, so it
+stops working on time even between advances.
+
+Sessions are saved in a `sessions` table next to `users` and loaded back on
+start, so they survive restarts. Only a SHA-256 digest of each token is kept,
+in memory and on disk. Another process sharing the file (a second web worker)
+finds sessions it didn't issue with one primary-key lookup on `sessions` and
+keeps them from then on. revoke() bumps the `sessions` data version (see
+data_version.py); every lookup compares it with the version it last saw, one
+stat() call, and on a change drops the sessions it kept, so a session ended in
+one process stops working in the others from their next request. Sessions
+still alive are then found again with one lookup each.
+"""
+import hashlib
+import math
+import os
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import users
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_version  # noqa: E402
+
+TTL = 8 * 60 * 60  # seconds a session lasts
+TICK = 1.0  # seconds per wheel slot
+SLOTS = 3600  # one turn of the wheel is an hour; longer sessions wait out whole turns
+
+Session = namedtuple('Session', 'user_id username expires_at')
+
+
+def digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TimerWheel:
+    # Expiry times hashed into `slots` buckets of `tick` seconds each
+    def __init__(self, tick=TICK, slots=SLOTS, now=None):
+        self.tick = tick
+        self.buckets = [{} for _ in range(slots)]
+        self.position = math.floor((time.time() if now is None else now) / tick)
+
+    def tick_of(self, moment):
+        return math.ceil(moment / self.tick)
+
+    def add(self, key, expires_at):
+        self.buckets[self.tick_of(expires_at) % len(self.buckets)][key] = expires_at
+
+    def discard(self, key, expires_at):
+        self.buckets[self.tick_of(expires_at) % len(self.buckets)].pop(key, None)
+
+    def advance(self, now):
+        # Remove and return the keys that expired by `now`. Each passed slot is
+        # visited once; keys due on a later turn of the wheel stay where they are.
+        target = math.floor(now / self.tick)
+        if target <= self.position:
+            return []
+        first = max(self.position + 1, target - len(self.buckets) + 1)
+        expired = []
+        for position in range(first, target + 1):
+            bucket = self.buckets[position % len(self.buckets)]
+            due = [key for key, expires_at in bucket.items() if expires_at <= now]
+            for key in due:
+                del bucket[key]
+            expired.extend(due)
+        self.position = target
+        return expired
+
+
+class SessionManager:
+    def __init__(self, path=users.USERS_DB, ttl=TTL, tick=TICK, slots=SLOTS):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.sessions = {}  # token digest -> Session
+        self.wheel = TimerWheel(tick, slots)
+        self.conn = sqlite3.connect(path, timeout=users.BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.create_table()
+        self.load()
+        self.revocations = data_version.version(path, 'sessions').ns  # last revocation seen
+
+    def create_table(self):
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                token_hash TEXT PRIMARY KEY,
+                user_id INTEGER,
+                username TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(sessions)')]
+        if 'user_id' not in columns:
+            # Sessions saved without the user's id are ended by load()
+            self.conn.execute('ALTER TABLE sessions ADD COLUMN user_id INTEGER')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)')
+        self.conn.commit()
+
+    def load(self):
+        # Drop sessions that ended while nothing was running, keep the rest
+        now = time.time()
+        with self.conn:
+            self.conn.execute('DELETE FROM sessions WHERE expires_at <= ? OR user_id IS NULL', (now,))
+        rows = self.conn.execute('SELECT token_hash, user_id, username, expires_at FROM sessions')
+        for key, user_id, username, expires_at in rows:
+            self.remember(key, Session(user_id, username, expires_at))
+
+    def remember(self, key, session):
+        self.sessions[key] = session
+        self.wheel.add(key, session.expires_at)
+
+    def issue(self, user_id, username):
+        """Start a session for the (already authenticated) user and return its token."""
+        token = secrets.token_urlsafe(32)
+        key = digest(token)
+        session = Session(user_id, username, time.time() + self.ttl)
+        with self.lock:
+            self.expire_locked(time.time())
+            with self.conn:
+                self.conn.execute(
+                    'INSERT INTO sessions (token_hash, user_id, username, expires_at) VALUES (?, ?, ?, ?)',
+                    (key, user_id, username, session.expires_at)
+                )
+            self.remember(key, session)
+        return token
+
+    def user(self, token):
+        """Username the session `token` belongs to, or None if it is unknown or expired."""
+        session = self.lookup(token)
+        return None if session is None else session.username
+
+    def lookup(self, token):
+        """The Session for `token`, or None if it is unknown or expired."""
+        if not token:
+            return None
+        key = digest(token)
+        now = time.time()
+        with self.lock:
+            self.expire_locked(now)
+            self.check_revocations()
+            session = self.sessions.get(key)
+            if session is None:
+                session = self.load_one(key, now)
+        if session is None or session.expires_at <= now:
+            return None
+        return session
+
+    def load_one(self, key, now):
+        # A session issued by another process since this one loaded
+        row = self.conn.execute(
+            'SELECT user_id, username, expires_at FROM sessions WHERE token_hash = ? AND expires_at > ? AND user_id IS NOT NULL',
+            (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        session = Session(*row)
+        self.remember(key, session)
+        return session
+
+    def check_revocations(self):
+        # Forget the kept sessions if any process has revoked one since the
+        # last check; load_one() brings back those that are still valid
+        current = data_version.version(self.path, 'sessions').ns
+        if current != self.revocations:
+            self.sessions.clear()
+            self.revocations = current
+
+    def revoke(self, token):
+        """End the session `token`, e.g. on logout. Returns whether it existed."""
+        if not token:
+            return False
+        key = digest(token)
+        with self.lock:
+            session = self.sessions.pop(key, None)
+            if session is not None:
+                self.wheel.discard(key, session.expires_at)
+            with self.conn:
+                deleted = self.conn.execute('DELETE FROM sessions WHERE token_hash = ?', (key,)).rowcount
+            if deleted:
+                data_version.bump(self.path, 'sessions')
+        return session is not None or deleted > 0
+
+    def expire(self, now=None):
+        """End every session past its expiry time; returns how many ended."""
+        with self.lock:
+            return self.expire_locked(time.time() if now is None else now)
+
+    def expire_locked(self, now):
+        expired = self.wheel.advance(now)
+        for key in expired:
+            self.sessions.pop(key, None)
+        if expired:
+            with self.conn:
+                self.conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (now,))
+        return len(expired)
+
+    def __len__(self):
+        return len(self.sessions)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_manager():
+    """The process-wide SessionManager for users.USERS_DB."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SessionManager()
+        return _default
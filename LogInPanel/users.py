@@ -0,0 +1,237 @@
+"""User accounts in users.db, without any GUI.
+
+RegisterILogin.py builds its Tk windows on top of these functions, and
+anything headless (the web app, scripts) can use them directly. Passwords are
+stored Fernet-encrypted with KEY, as they always have been.
+
+provision_users() registers many accounts at once, e.g. to seed a test
+database or migrate users from elsewhere:
+
+    python LogInPanel/users.py provision accounts.csv   # CSV with username,password columns
+
+Passwords are encrypted across a process pool, all new rows go in with one
+executemany() in a single transaction, and every account that could not be
+created is reported with the reason instead of stopping the batch.
+
+list_users() returns one page of usernames at a time, optionally only those
+starting with a prefix. Both are range scans of the unique index on
+`username`, so a page costs the same with a hundred users or 100k:
+
+    python LogInPanel/users.py list [--prefix ann] [--after anna99]
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from cryptography.fernet import Fernet, InvalidToken
+
+# Fixed key for encrypting and decrypting passwords
+KEY = b'G1uOU6RQF_8jEBb-uDd9grbU8SPhXZcWxv1Whtw3PpA='
+cipher = Fernet(KEY)
+
+USERS_DB = os.environ.get('WE_MOVE_USERS_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'users.db'))
+BUSY_TIMEOUT_MS = 5000
+
+# check_password() results
+OK = 'ok'
+UNKNOWN_USER = 'unknown_user'
+WRONG_PASSWORD = 'wrong_password'
+
+# Reasons provision_users() gives for accounts it did not create
+EXISTS = 'exists'  # the username is already registered
+DUPLICATE = 'duplicate'  # the username appears earlier in the same batch
+INVALID = 'invalid'  # empty username or password
+
+PAGE_SIZE = 50  # users per list_users() page
+ENCRYPT_CHUNK = 2000  # passwords per task sent to the process pool
+LOOKUP_CHUNK = 500  # usernames per existence query, below SQLite's parameter limit
+
+Provisioned = namedtuple('Provisioned', 'created conflicts')  # conflicts: [(username, reason)]
+
+
+def connect(path=USERS_DB):
+    """Open a connection to the users database, creating the users table if needed."""
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.execute("PRAGMA journal_mode = WAL")
+    create_table(conn)
+    return conn
+
+
+def create_table(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS users (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        username TEXT NOT NULL UNIQUE,
+                        password BLOB NOT NULL
+                    );""")
+    conn.commit()
+
+
+def check_password(conn, username, password):
+    """OK, UNKNOWN_USER or WRONG_PASSWORD for the given credentials."""
+    row = conn.execute("SELECT password FROM users WHERE username = ?", (username,)).fetchone()
+    if row is None:
+        return UNKNOWN_USER
+    try:
+        stored = cipher.decrypt(row[0]).decode()
+    except InvalidToken:
+        return WRONG_PASSWORD
+    return OK if stored == password else WRONG_PASSWORD
+
+
+def find_user_id(conn, username):
+    """Id of the user called `username`, or None."""
+    row = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+    return None if row is None else row[0]
+
+
+def encrypt_passwords(passwords):
+    # Runs in the pool's worker processes
+    return [cipher.encrypt(password.encode()) for password in passwords]
+
+
+def existing_usernames(conn, usernames):
+    found = set()
+    for start in range(0, len(usernames), LOOKUP_CHUNK):
+        chunk = usernames[start:start + LOOKUP_CHUNK]
+        placeholders = ', '.join('?' * len(chunk))
+        found.update(row[0] for row in conn.execute(
+            f"SELECT username FROM users WHERE username IN ({placeholders})", chunk
+        ))
+    return found
+
+
+def provision_users(accounts, path=USERS_DB, processes=None):
+    """Register every (username, password) in `accounts` and return a Provisioned.
+
+    Passwords are encrypted in `processes` worker processes (default: one per
+    CPU; 0 encrypts in this process). Accounts that can't be created are left
+    out and listed in `conflicts` with EXISTS, DUPLICATE or INVALID.
+    """
+    conflicts = []
+    seen = set()
+    candidates = []
+    for username, password in accounts:
+        if not username or not password:
+            conflicts.append((username, INVALID))
+        elif username in seen:
+            conflicts.append((username, DUPLICATE))
+        else:
+            seen.add(username)
+            candidates.append((username, password))
+
+    conn = connect(path)
+    try:
+        # Skip known usernames before spending time on their passwords
+        taken = existing_usernames(conn, [username for username, _ in candidates])
+        conflicts.extend((username, EXISTS) for username, _ in candidates if username in taken)
+        candidates = [(username, password) for username, password in candidates if username not in taken]
+
+        passwords = [password for _, password in candidates]
+        if processes == 0 or len(passwords) <= ENCRYPT_CHUNK:
+            encrypted = encrypt_passwords(passwords)
+        else:
+            chunks = [passwords[start:start + ENCRYPT_CHUNK] for start in range(0, len(passwords), ENCRYPT_CHUNK)]
+            with ProcessPoolExecutor(processes) as pool:
+                encrypted = [token for chunk in pool.map(encrypt_passwords, chunks) for token in chunk]
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Someone may have registered one of the names while we were encrypting
+            taken = existing_usernames(conn, [username for username, _ in candidates])
+            rows = [(username, token) for (username, _), token in zip(candidates, encrypted) if username not in taken]
+            conflicts.extend((username, EXISTS) for username, _ in candidates if username in taken)
+            conn.executemany("INSERT INTO users (username, password) VALUES (?, ?)", rows)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+    return Provisioned(len(rows), conflicts)
+
+
+def prefix_end(prefix):
+    # Smallest string above every string starting with `prefix` (None if there
+    # is no such bound). UTF-8 keeps code point order, which SQLite compares by.
+    while prefix:
+        last = ord(prefix[-1])
+        if last < 0x10FFFF:
+            return prefix[:-1] + chr(last + 1)
+        prefix = prefix[:-1]
+    return None
+
+
+def list_users(conn, prefix='', after=None, limit=PAGE_SIZE):
+    """One page of (id, username) in username order.
+
+    Only usernames starting with `prefix` are listed, and only those after
+    `after` (the last username of the previous page).
+    """
+    # One lower and one upper bound, so the index range starts right at the page
+    conditions, params = [], []
+    if after is not None and after >= prefix:
+        conditions.append("username > ?")
+        params.append(after)
+    elif prefix:
+        conditions.append("username >= ?")
+        params.append(prefix)
+    end = prefix_end(prefix)
+    if end is not None:
+        conditions.append("username < ?")
+        params.append(end)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return conn.execute(
+        f"SELECT id, username FROM users {where} ORDER BY username LIMIT ?", (*params, limit)
+    ).fetchall()
+
+
+def read_accounts(path):
+    # (username, password) rows from a CSV file with those two columns
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield row.get('username', ''), row.get('password', '')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage user accounts without the GUI.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    provision = commands.add_parser('provision', help="register the accounts listed in a CSV file")
+    provision.add_argument('file', help="CSV file with username and password columns")
+    provision.add_argument('--database', default=USERS_DB)
+    provision.add_argument('--processes', type=int, help="encryption processes (default: one per CPU)")
+    listing = commands.add_parser('list', help="list registered usernames, a page at a time")
+    listing.add_argument('--prefix', default='', help="only usernames starting with this")
+    listing.add_argument('--after', help="start after this username (the last one of the previous page)")
+    listing.add_argument('--limit', type=int, default=PAGE_SIZE)
+    listing.add_argument('--database', default=USERS_DB)
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        conn = connect(args.database)
+        try:
+            for user_id, username in list_users(conn, args.prefix, args.after, args.limit):
+                print(f"{user_id:>8}  {username}")
+        finally:
+            conn.close()
+        return 0
+
+    started = time.perf_counter()
+    try:
+        result = provision_users(read_accounts(args.file), args.database, args.processes)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error provisioning users: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+    for username, reason in result.conflicts:
+        print(f"Skipped {username!r}: {reason}")
+    print(f"Created {result.created} users in {elapsed:.2f} s, skipped {len(result.conflicts)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
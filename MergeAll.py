@@ -1,13 +1,58 @@
 import sys
 import tkinter as tk
 from tkinter import ttk
-from Self_Goals import TaskApp  
-from Journal import JournalApp  
-from PyQt5.QtWidgets import QApplication
+
+import db
+
+# PyQt5 and the sub-apps are only imported once one is opened, so the
+# menu comes up without waiting for them.
+
+class QtWindows:
+    # The launcher's single QApplication and the windows it hosts. Both are
+    # created the first time they're needed and kept afterwards: closing a
+    # window only hides it, and opening it again just shows it.
+
+    def __init__(self, user_id=db.LOCAL_USER):
+        self.user_id = user_id
+        self.qt_app = None
+        self.windows = {}
+
+    def app(self):
+        if self.qt_app is None:
+            from PyQt5.QtWidgets import QApplication
+            # Held here: Qt tears the application down once nothing references it
+            self.qt_app = QApplication.instance() or QApplication(sys.argv)
+        return self.qt_app
+
+    def window(self, name):
+        window = self.windows.get(name)
+        if window is None:
+            self.app()
+            if name == 'journal':
+                from Journal import JournalApp
+                window = JournalApp(self.user_id)
+            else:
+                from Self_Goals import TaskApp
+                window = TaskApp(self.user_id)
+            self.windows[name] = window
+        return window
+
+    def run(self, name):
+        # Show the window and run Qt until it is closed
+        window = self.window(name)
+        window.show()
+        window.raise_()
+        window.activateWindow()
+        self.app().exec_()
 
 class MainApp:
-    def __init__(self, master):
+    # The launcher menu. Its windows show the journal and tasks of `user_id`:
+    # the login panel (LogInPanel/RegisterILogin.py) opens it for the user who
+    # logged in, running this file directly for LOCAL_USER.
+
+    def __init__(self, master, user_id=db.LOCAL_USER):
         self.master = master
+        self.qt = QtWindows(user_id)
         self.master.title("We_Move")
         self.master.geometry("400x300")
         self.master.configure(bg='#F7E3D3')
@@ -41,29 +86,20 @@ class MainApp:
                   background=[("active", "#FF7B57")]) 
 
     def open_journal_app(self):
-        self.master.withdraw() 
-        app = QApplication(sys.argv)
-
-        # Create the JournalApp instance and show it
-        journal_app = JournalApp()
-        journal_app.show()
-
-        # To keep the Tkinter window hidden while PyQt5 is running
-        app.exec_()
-
-        # Re-show the Tkinter window when the PyQt app is closed
-        self.master.deiconify()
+        self.open_qt_app('journal')
 
     def open_task_app(self):
+        self.open_qt_app('goals')
+
+    def open_qt_app(self, name):
+        # Keep the Tkinter window hidden while the PyQt5 window is open
+        self.master.withdraw()
         try:
-            app = QApplication(sys.argv)
-            task_app = TaskApp()
-            task_app.show()
-            self.master.withdraw() 
-            app.exec_()  # Run the PyQt5 application loop
-            self.master.deiconify()  # Re-show the Tkinter window when done
+            self.qt.run(name)
         except Exception as e:
-            print(f"Error opening task app: {e}")
+            print(f"Error opening {name} app: {e}")
+        finally:
+            self.master.deiconify()  # Re-show the Tkinter window when done
 
 if __name__ == "__main__":
     root = tk.Tk()
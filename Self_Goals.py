@@ -1,28 +1,47 @@
 import sys
-import sqlite3
+import threading
+from array import array
+from bisect import bisect_left
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QPushButton,
-    QLineEdit, QListWidget, QMessageBox, QWidget, QLabel, QInputDialog
+    QLineEdit, QListView, QMessageBox, QWidget, QLabel, QInputDialog
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, pyqtSignal
+
+import data_version
+import db
+import write_queue
 
 class Task:
+    # A single task as returned by TaskList.get_task() and TaskList.task_at().
+    # TaskList itself keeps its tasks in columns, not as Task objects.
+    __slots__ = ('id', 'description', 'completed')
+
     def __init__(self, id, description, completed=False):
         self.id = id
         self.description = description
         self.completed = completed
 
-    def mark_completed(self):
-        self.completed = True
-
     def __str__(self):
         status = "[X]" if self.completed else "[ ]"
         return f"{status} {self.description}"
 
 class TaskList:
-    def __init__(self):
-        self.conn = sqlite3.connect('tasks.db')
+    DB_FILE = 'tasks.db'
+
+    def __init__(self, user_id=db.LOCAL_USER):
+        self.user_id = user_id  # Only this user's tasks are loaded and written
+        self.closed = False
+        # Writes change the columns below once they are committed, which with a
+        # write queue happens on its writer thread; readers take the lock too
+        self.lock = threading.Lock()
+        self.listeners = []
+        self.conn = db.get_connection(TaskList.DB_FILE)
         self.cursor = self.conn.cursor()
+        db.init_schema(TaskList.DB_FILE, 'tasks', self.create_table)
+        self.load_tasks()
+
+    def create_table(self):
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS tasks (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -30,54 +49,177 @@ class TaskList:
                 completed INTEGER NOT NULL
             )
         ''')
+        # Tasks from before there were users belong to LOCAL_USER
+        columns = [row[1] for row in self.cursor.execute('PRAGMA table_info(tasks)')]
+        if 'user_id' not in columns:
+            self.cursor.execute(f'ALTER TABLE tasks ADD COLUMN user_id INTEGER NOT NULL DEFAULT {db.LOCAL_USER}')
+        # A user's tasks in id order (the rowid ends the index), and by status
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user ON tasks (user_id)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user_completed ON tasks (user_id, completed, id)')
         self.conn.commit()
-        self.load_tasks()
 
     def load_tasks(self):
-        self.tasks = []
-        self.cursor.execute("SELECT id, description, completed FROM tasks")
-        rows = self.cursor.fetchall()
-        for row in rows:
-            task = Task(row[0], row[1], bool(row[2]))
-            self.tasks.append(task)
+        # Tasks are kept in parallel columns, in id order: ids in an array of
+        # 64-bit ints, completed flags in a bytearray and descriptions in a list
+        # of interned strings, so repeated descriptions are stored once. Ids only
+        # ever grow, so a task's row is found by bisecting the id column.
+        ids = array('q')
+        completed_flags = bytearray()
+        descriptions = []
+        self.cursor.execute(
+            "SELECT id, description, completed FROM tasks WHERE user_id = ? ORDER BY id", (self.user_id,)
+        )
+        for task_id, description, completed in self.cursor:
+            ids.append(task_id)
+            completed_flags.append(1 if completed else 0)
+            descriptions.append(sys.intern(description))
+        with self.lock:
+            self.ids, self.completed, self.descriptions = ids, completed_flags, descriptions
+
+    def add_listener(self, listener):
+        # Register a callable() to be told whenever the tasks in memory have
+        # changed. With an ASYNC or BATCHED write queue it is called on the
+        # queue's writer thread.
+        self.listeners.append(listener)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row_of(self, task_id):
+        # Row of the task with this id, or None.
+        row = bisect_left(self.ids, task_id)
+        if row < len(self.ids) and self.ids[row] == task_id:
+            return row
+        return None
+
+    def task_at(self, row):
+        with self.lock:
+            return Task(self.ids[row], self.descriptions[row], bool(self.completed[row]))
+
+    def get_task(self, task_id):
+        row = self.row_of(task_id)
+        return None if row is None else self.task_at(row)
+
+    def format_task(self, row):
+        return str(self.task_at(row))
+
+    def bump_version(self):
+        # Mark the tasks as changed for HTTP caches; see data_version.py.
+        data_version.bump(TaskList.DB_FILE, 'tasks')
+
+    def write(self, write, update):
+        # Run write(conn) through the write queue. Only once it is committed is
+        # update() applied to the columns and are the listeners told, so the
+        # tasks in memory never show a write that failed.
+        def after_commit():
+            with self.lock:
+                update()
+            for listener in list(self.listeners):
+                listener()
+            self.bump_version()
+        return write_queue.run(self.conn, TaskList.DB_FILE, write, after_commit)
 
     def add_task(self, description):
-        task = Task(None, description)
-        self.tasks.append(task)
-        self.cursor.execute("INSERT INTO tasks (description, completed) VALUES (?, ?)", (description, 0))
-        self.conn.commit()
-        return task.id  # Return the ID of the newly added task
-
-    def complete_tasks(self, indices):
-        for index in indices:
-            if 0 <= index < len(self.tasks):
-                task_id = self.tasks[index].id
-                self.tasks[index].mark_completed()
-                self.cursor.execute("UPDATE tasks SET completed = 1 WHERE id = ?", (task_id,))
-        self.conn.commit()
+        # Returns the new task's id, or None if the write was queued
+        # asynchronously; the task is added to the list once it is committed.
+        description = sys.intern(description)
+        added = []
 
-    def remove_completed_tasks(self, indices):
-        for index in sorted(indices, reverse=True):
-            task_id = self.tasks[index].id
-            self.cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-            del self.tasks[index]
-        self.conn.commit()
+        def write(conn):
+            added.append(conn.execute(
+                "INSERT INTO tasks (user_id, description, completed) VALUES (?, ?, ?)", (self.user_id, description, 0)
+            ).lastrowid)
+            return added[-1]
 
-    def edit_task(self, index, new_description):
-        if 0 <= index < len(self.tasks):
-            task_id = self.tasks[index].id
-            self.cursor.execute("UPDATE tasks SET description = ? WHERE id = ?", (new_description, task_id))
-            self.tasks[index].description = new_description
-            self.conn.commit()
+        def update():
+            self.ids.append(added[-1])
+            self.completed.append(0)
+            self.descriptions.append(description)
+        return self.write(write, update)
+
+    def complete_tasks(self, task_ids):
+        task_ids = [task_id for task_id in task_ids if self.row_of(task_id) is not None]
+
+        def update():
+            for task_id in task_ids:
+                row = self.row_of(task_id)
+                if row is not None:
+                    self.completed[row] = 1
+        self.write(lambda conn: conn.executemany(
+            "UPDATE tasks SET completed = 1 WHERE id = ? AND user_id = ?",
+            ((task_id, self.user_id) for task_id in task_ids)
+        ), update)
+
+    def remove_completed_tasks(self, task_ids):
+        removed = {task_id for task_id in task_ids if self.row_of(task_id) is not None}
+
+        def update():
+            if removed:
+                # One pass over the columns, however many tasks are removed
+                keep = [row for row, task_id in enumerate(self.ids) if task_id not in removed]
+                self.ids = array('q', (self.ids[row] for row in keep))
+                self.completed = bytearray(self.completed[row] for row in keep)
+                self.descriptions = [self.descriptions[row] for row in keep]
+        self.write(lambda conn: conn.executemany(
+            "DELETE FROM tasks WHERE id = ? AND user_id = ?", ((task_id, self.user_id) for task_id in removed)
+        ), update)
+
+    def edit_tasks(self, descriptions):
+        # `descriptions` maps task ids to their new description.
+        changes = [(sys.intern(description), task_id, self.user_id) for task_id, description in descriptions.items()
+                   if self.row_of(task_id) is not None]
+
+        def update():
+            for description, task_id, _ in changes:
+                row = self.row_of(task_id)
+                if row is not None:
+                    self.descriptions[row] = description
+        self.write(lambda conn: conn.executemany(
+            "UPDATE tasks SET description = ? WHERE id = ? AND user_id = ?", changes
+        ), update)
+
+    def edit_task(self, task_id, new_description):
+        self.edit_tasks({task_id: new_description})
 
     def show_tasks(self):
-        return [str(task) for task in self.tasks]
+        return [self.format_task(row) for row in range(len(self))]
 
     def close(self):
-        self.conn.close()
+        db.close_connection(TaskList.DB_FILE)
+        self.closed = True
+
+class TaskListModel(QAbstractListModel):
+    # List model over a TaskList. The "[X] description" text is only built for
+    # the rows the view actually paints.
+
+    def __init__(self, task_list, parent=None):
+        super().__init__(parent)
+        self.task_list = task_list
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.task_list)
+
+    def data(self, index, role=Qt.DisplayRole):
+        # A queued write can shrink the list before the reset it triggers
+        # reaches the view
+        if not index.isValid() or index.row() >= len(self.task_list):
+            return None
+        if role == Qt.DisplayRole:
+            return self.task_list.format_task(index.row())
+        if role == Qt.UserRole:
+            return self.task_list.ids[index.row()]
+        return None
+
+    def reload(self):
+        self.beginResetModel()
+        self.endResetModel()
 
 class TaskApp(QMainWindow):
-    def __init__(self):
+    # Emitted by the task list's listener, from whichever thread committed the
+    # write; Qt delivers it on the window's thread
+    tasks_changed = pyqtSignal()
+
+    def __init__(self, user_id=db.LOCAL_USER):
         super().__init__()
 
         self.setWindowTitle("Task List Manager")
@@ -87,7 +229,9 @@ class TaskApp(QMainWindow):
         self.setCentralWidget(self.main_widget)
         self.main_layout = QVBoxLayout(self.main_widget)
 
-        self.task_list = TaskList()
+        self.task_list = TaskList(user_id)
+        self.task_list.add_listener(self.tasks_changed.emit)
+        self.tasks_changed.connect(self.update_task_list)
 
         # Title label
         self.title_label = QLabel("Task List", self)
@@ -103,10 +247,12 @@ class TaskApp(QMainWindow):
         self.add_button.setShortcut("Ctrl+A")  # Keyboard shortcut for adding tasks
         self.main_layout.addWidget(self.add_button)
 
-        self.task_list_widget = QListWidget(self)
-        self.task_list_widget.setSelectionMode(QListWidget.MultiSelection)
-        self.update_task_list()
-        self.main_layout.addWidget(self.task_list_widget)
+        self.task_model = TaskListModel(self.task_list, self)
+        self.task_list_view = QListView(self)
+        self.task_list_view.setUniformItemSizes(True)  # Lets the view skip measuring every row
+        self.task_list_view.setSelectionMode(QListView.MultiSelection)
+        self.task_list_view.setModel(self.task_model)
+        self.main_layout.addWidget(self.task_list_view)
 
         self.button_layout = QHBoxLayout()
 
@@ -130,26 +276,23 @@ class TaskApp(QMainWindow):
     def add_task(self):
         task_description = self.task_entry.text().strip()
         if task_description and len(task_description) <= 100:
-            task_id = self.task_list.add_task(task_description)
+            self.task_list.add_task(task_description)
             self.task_entry.clear()
-            self.update_task_list()
             QMessageBox.information(self, "Success", f"Task '{task_description}' added successfully.")
         else:
             QMessageBox.warning(self, "Invalid Task", "Please enter a valid task description (1-100 characters).")
 
     def complete_selected_tasks(self):
-        selected_items = self.task_list_widget.selectedItems()
-        if selected_items:
-            indices = [self.task_list_widget.row(item) for item in selected_items]
-            self.task_list.complete_tasks(indices)
-            self.update_task_list()
+        selected_indexes = self.task_list_view.selectedIndexes()
+        if selected_indexes:
+            self.task_list.complete_tasks(self.selected_task_ids(selected_indexes))
             QMessageBox.information(self, "Success", "Selected tasks marked as completed. Good Job!")
         else:
             QMessageBox.warning(self, "Error", "Select at least one task to mark as completed.")
 
     def remove_selected_tasks(self):
-        selected_items = self.task_list_widget.selectedItems()
-        if selected_items:
+        selected_indexes = self.task_list_view.selectedIndexes()
+        if selected_indexes:
             confirmation = QMessageBox.question(
                 self,
                 "Confirm Deletion",
@@ -158,31 +301,39 @@ class TaskApp(QMainWindow):
                 QMessageBox.No
             )
             if confirmation == QMessageBox.Yes:
-                indices = [self.task_list_widget.row(item) for item in selected_items]
-                self.task_list.remove_completed_tasks(indices)
-                self.update_task_list()
+                self.task_list.remove_completed_tasks(self.selected_task_ids(selected_indexes))
                 QMessageBox.information(self, "Success", "Selected tasks removed successfully.")
         else:
             QMessageBox.warning(self, "Error", "Select at least one task to remove.")
 
     def edit_selected_task(self):
-        selected_items = self.task_list_widget.selectedItems()
-        if selected_items:
-            index = self.task_list_widget.row(selected_items[0])  # Edit only the first selected item
+        selected_indexes = self.task_list_view.selectedIndexes()
+        if selected_indexes:
+            task_id = selected_indexes[0].data(Qt.UserRole)  # Edit only the first selected item
             new_description, ok = QInputDialog.getText(self, "Edit Task", "New Task Description:")
             if ok and new_description.strip():
-                self.task_list.edit_task(index, new_description)
-                self.update_task_list()
+                self.task_list.edit_task(task_id, new_description)
                 QMessageBox.information(self, "Success", "Task edited successfully.")
             else:
                 QMessageBox.warning(self, "Invalid Task", "Please enter a valid task description.")
         else:
             QMessageBox.warning(self, "Error", "Select a task to edit.")
 
+    def selected_task_ids(self, selected_indexes):
+        return [index.data(Qt.UserRole) for index in selected_indexes]
+
     def update_task_list(self):
-        self.task_list_widget.clear()
-        for task in self.task_list.show_tasks():
-            self.task_list_widget.addItem(task)
+        self.task_model.reload()
+
+    def showEvent(self, event):
+        # Shown again after being closed (the launcher keeps its windows):
+        # reopen the connection and pick up changes made in the meantime
+        if self.task_list.closed:
+            self.task_list = TaskList(self.task_list.user_id)
+            self.task_list.add_listener(self.tasks_changed.emit)
+            self.task_model.task_list = self.task_list
+            self.update_task_list()
+        super().showEvent(event)
 
     def closeEvent(self, event):
         self.task_list.close()
@@ -0,0 +1,116 @@
+"""Background music for the journal windows.
+
+AudioService plays a playlist on its own thread: pygame is imported, the mixer
+opened and each track loaded there, so a window that starts the music is on
+screen straight away instead of waiting for the audio device and the first
+file. Tracks play in order and the playlist repeats. Anything that goes wrong
+(no pygame, no audio device, a missing or unreadable file) is printed once and
+skipped; the journal works the same without music.
+
+Configured through the environment:
+
+    WE_MOVE_PLAYLIST   audio files separated by os.pathsep (default: PLAYLIST)
+    WE_MOVE_VOLUME     0.0 to 1.0 (default: 0.5)
+    WE_MOVE_AUDIO=off  no audio at all, e.g. on servers and in tests; pygame is
+                       then never imported
+"""
+import atexit
+import os
+import threading
+import weakref
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+PLAYLIST = [os.path.join(ROOT, 'relaxing_music.mp3')]
+VOLUME = 0.5
+POLL_INTERVAL = 0.25  # seconds between checks whether the current track has ended
+
+_services = weakref.WeakSet()  # services that have been started
+
+
+def configured_playlist():
+    """The playlist from WE_MOVE_PLAYLIST, or PLAYLIST if it isn't set."""
+    paths = os.environ.get('WE_MOVE_PLAYLIST')
+    if not paths:
+        return list(PLAYLIST)
+    return [os.path.expanduser(path) for path in paths.split(os.pathsep) if path]
+
+
+def audio_enabled():
+    """False when WE_MOVE_AUDIO turns audio off."""
+    return os.environ.get('WE_MOVE_AUDIO', 'on').lower() not in ('off', '0', 'false', 'no')
+
+
+class AudioService:
+    def __init__(self, playlist=None, volume=None, enabled=None):
+        self.playlist = configured_playlist() if playlist is None else list(playlist)
+        self.volume = float(os.environ.get('WE_MOVE_VOLUME', VOLUME)) if volume is None else volume
+        self.enabled = audio_enabled() if enabled is None else enabled
+        self.thread = None
+        self.stopping = threading.Event()
+
+    @property
+    def playing(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        """Start playing in the background; does nothing if already playing or disabled."""
+        if not self.enabled or not self.playlist or self.playing:
+            return
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(self.stopping,), name='audio', daemon=True)
+        self.thread.start()
+        _services.add(self)
+
+    def stop(self, timeout=1.0):
+        """Stop the music and wait up to `timeout` seconds for the thread to finish."""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            # A thread that is still closing the mixer stays referenced, so
+            # start() won't run a second one next to it
+            if not self.thread.is_alive():
+                self.thread = None
+
+    def run(self, stopping):
+        # The service thread: every pygame call happens here
+        try:
+            import pygame
+            # After pygame's own exit handler, so it runs before it (atexit
+            # goes newest first) and the mixer is closed here, not under us
+            atexit.unregister(stop_all)
+            atexit.register(stop_all)
+            pygame.mixer.init()
+        except Exception as e:
+            print(f"Error starting audio: {e}")
+            return
+        try:
+            pygame.mixer.music.set_volume(self.volume)
+            self.play(pygame, stopping)
+        finally:
+            pygame.mixer.music.stop()
+            pygame.mixer.quit()
+
+    def play(self, pygame, stopping):
+        playable = list(self.playlist)
+        while playable and not stopping.is_set():
+            for path in list(playable):
+                if stopping.is_set():
+                    return
+                try:
+                    pygame.mixer.music.load(path)
+                    # A single track loops without a gap
+                    pygame.mixer.music.play(-1 if len(playable) == 1 else 0)
+                except Exception as e:
+                    print(f"Error playing {path}: {e}")
+                    playable.remove(path)  # not retried on the next pass
+                    continue
+                while pygame.mixer.music.get_busy() and not stopping.wait(POLL_INTERVAL):
+                    pass
+
+
+def stop_all():
+    # Let each service thread close the mixer before the interpreter shuts
+    # down; pygame closing it from the main thread at the same time can hang.
+    for service in list(_services):
+        service.stop()
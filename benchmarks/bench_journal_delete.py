@@ -0,0 +1,53 @@
+"""Time single-entry deletes as the journal grows.
+
+Run from the repository root:
+
+    python benchmarks/bench_journal_delete.py
+
+Each size is seeded in a fresh temporary database, then a batch of entries
+from the middle of the journal is deleted one at a time through
+``Journal.delete_entry``. The average time per delete should stay roughly
+flat from 1k to 100k entries.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Journal_M import Journal  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000]
+DELETES = 200
+
+
+def seed(journal, size):
+    with journal.conn:
+        journal.conn.executemany(
+            'INSERT INTO journal_entries (number, title, content, mood, date) VALUES (?, ?, ?, ?, ?)',
+            ((n, f"Title {n}", "Lorem ipsum " * 20, "Happy", "2024-01-01T00:00:00") for n in range(1, size + 1))
+        )
+
+
+def main():
+    print(f"{'entries':>10} | {'avg delete (ms)':>16}")
+    print("-" * 30)
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            Journal.DB_FILE = os.path.join(tmp, "journal.db")
+            journal = Journal()
+            seed(journal, size)
+
+            start_number = size // 2
+            started = time.perf_counter()
+            for number in range(start_number, start_number + DELETES):
+                journal.delete_entry(number)
+            elapsed = time.perf_counter() - started
+            journal.conn.close()
+
+        print(f"{size:>10} | {elapsed / DELETES * 1000:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
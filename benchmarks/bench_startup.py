@@ -0,0 +1,107 @@
+"""Measure how long the launcher takes to show its menu and its windows.
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py
+
+Every measurement starts a fresh interpreter, since what matters is what a
+new process has to import and build, and is repeated RUNS times:
+
+- menu: import MergeAll and put the Tk menu on screen (only the import
+  without a display). `eager imports` is what the menu used to wait for:
+  Self_Goals, Journal, PyQt5 and pygame imported up front.
+- <window> (cold): open a window from the just-started launcher: import the
+  sub-app, create the QApplication, build and show the window. The journal's
+  music starts on its own thread and is not waited for (see audio.py).
+- <window> (warm): close the window and open it again, as a second click in
+  the menu does.
+
+Without a display Qt runs offscreen. The databases go to a temporary directory.
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5
+
+CHILD = r'''
+import sys, time
+started = time.perf_counter()
+mode = sys.argv[1]
+if mode == 'eager':
+    import tkinter
+    import pygame
+    import Self_Goals, Journal
+    from PyQt5.QtWidgets import QApplication
+    print(f'RESULT {time.perf_counter() - started}')
+elif mode == 'menu':
+    import tkinter as tk
+    import MergeAll
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        root = None  # no display: the import is all there is to measure
+    if root is not None:
+        MergeAll.MainApp(root)
+        root.update()
+    print(f'RESULT {time.perf_counter() - started}')
+else:
+    import MergeAll
+    windows = MergeAll.QtWindows()
+    started = time.perf_counter()
+    window = windows.window(mode)
+    window.show()
+    windows.app().processEvents()
+    cold = time.perf_counter() - started
+    window.close()
+    windows.app().processEvents()
+    started = time.perf_counter()
+    window = windows.window(mode)
+    window.show()
+    windows.app().processEvents()
+    print(f'RESULT {cold} {time.perf_counter() - started}')
+'''
+
+
+def run_child(mode, workdir):
+    env = dict(os.environ, PYTHONPATH=ROOT, WE_MOVE_JOURNAL_DB=os.path.join(workdir, 'journal.db'))
+    if not env.get('DISPLAY'):
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    env.setdefault('SDL_AUDIODRIVER', 'dummy')
+    result = subprocess.run([sys.executable, '-c', CHILD, mode], cwd=workdir, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed')
+    # Other output (e.g. the music thread's) can be mixed into the same line
+    found = re.findall(r'RESULT((?:\s+[0-9.e-]+)+)', result.stdout)
+    if not found:
+        raise RuntimeError(f"no result in output: {result.stdout.strip()!r}")
+    return [float(value) for value in found[-1].split()]
+
+
+def report(name, times):
+    print(f"{name:<22} median {statistics.median(times) * 1000:8.1f} ms   "
+          f"min {min(times) * 1000:8.1f} ms")
+
+
+def main():
+    print(f"{RUNS} fresh processes each; display: {os.environ.get('DISPLAY') or 'none (offscreen Qt)'}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode, name in (('eager', 'menu (eager imports)'), ('menu', 'menu')):
+            report(name, [run_child(mode, workdir)[0] for _ in range(RUNS)])
+        for mode in ('journal', 'goals'):
+            try:
+                runs = [run_child(mode, workdir) for _ in range(RUNS)]
+            except RuntimeError as e:
+                print(f"{mode + ' window':<22} failed: {e}")
+                continue
+            report(f"{mode} window (cold)", [cold for cold, _ in runs])
+            report(f"{mode} window (warm)", [warm for _, warm in runs])
+
+
+if __name__ == '__main__':
+    main()
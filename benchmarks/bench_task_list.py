@@ -0,0 +1,57 @@
+"""Time bulk task operations on a large task list.
+
+Run from the repository root:
+
+    python benchmarks/bench_task_list.py
+
+50k tasks are seeded in a temporary database and loaded through
+``Self_Goals.TaskList``. Then half of them are completed, edited and removed in
+one call each, the way the task window does it for a multi-selection. Every
+call is a single executemany() transaction plus O(1) work per task in memory.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+from Self_Goals import TaskList  # noqa: E402
+
+TASKS = 50_000
+ADDS = 1_000
+
+
+def timed(name, action, *args):
+    started = time.perf_counter()
+    action(*args)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<28} {elapsed * 1000:10.1f} ms")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        TaskList.DB_FILE = os.path.join(tmp, 'tasks.db')
+        task_list = TaskList()
+        with task_list.conn:
+            task_list.conn.executemany(
+                'INSERT INTO tasks (description, completed) VALUES (?, 0)',
+                ((f"Task {i}",) for i in range(TASKS))
+            )
+
+        timed(f'load {TASKS} tasks', task_list.load_tasks)
+        timed(f'add {ADDS} tasks', lambda: [task_list.add_task(f"New task {i}") for i in range(ADDS)])
+        half = task_list.ids[::2].tolist()
+        timed(f'complete {len(half)} tasks', task_list.complete_tasks, half)
+        timed(f'edit {len(half)} tasks', task_list.edit_tasks, {task_id: 'Edited' for task_id in half})
+        timed(f'look up {len(half)} tasks', lambda: [task_list.get_task(task_id) for task_id in half])
+        timed(f'remove {len(half)} tasks', task_list.remove_completed_tasks, half)
+
+        remaining = task_list.conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+        assert remaining == len(task_list) == TASKS + ADDS - len(half), remaining
+        db.close_connection(TaskList.DB_FILE)
+
+
+if __name__ == '__main__':
+    main()
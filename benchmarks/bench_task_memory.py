@@ -0,0 +1,69 @@
+"""Measure the memory a loaded task list takes per task.
+
+Run from the repository root:
+
+    python benchmarks/bench_task_memory.py
+
+Tasks are seeded in a temporary database, then loaded twice while tracemalloc
+counts the bytes allocated: once through ``Self_Goals.TaskList`` (columns of
+ids, flags and interned descriptions) and once as one plain Python object per
+row in an id-keyed dict, the way tasks used to be held. Descriptions repeat the
+way recurring goals do, which is where interning pays off.
+"""
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+from Self_Goals import TaskList  # noqa: E402
+
+SIZES = [10_000, 100_000]
+DISTINCT_DESCRIPTIONS = 500
+
+
+class PlainTask:
+    def __init__(self, id, description, completed=False):
+        self.id = id
+        self.description = description
+        self.completed = completed
+
+
+def load_plain(conn):
+    return {
+        task_id: PlainTask(task_id, description, bool(completed))
+        for task_id, description, completed in conn.execute('SELECT id, description, completed FROM tasks ORDER BY id')
+    }
+
+
+def measure(load):
+    tracemalloc.start()
+    kept = load()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def main():
+    print(f"{'tasks':>10} | {'TaskList (B/task)':>18} | {'objects (B/task)':>17}")
+    print("-" * 52)
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            TaskList.DB_FILE = os.path.join(tmp, 'tasks.db')
+            task_list = TaskList()
+            with task_list.conn:
+                task_list.conn.executemany(
+                    'INSERT INTO tasks (description, completed) VALUES (?, ?)',
+                    ((f"Goal number {i % DISTINCT_DESCRIPTIONS}", i % 3 == 0) for i in range(size))
+                )
+            columns = measure(lambda: task_list.load_tasks() or (task_list.ids, task_list.completed, task_list.descriptions))
+            objects = measure(lambda: load_plain(task_list.conn))
+            db.close_connection(TaskList.DB_FILE)
+        print(f"{size:>10} | {columns / size:>18.1f} | {objects / size:>17.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Measure bulk export/import throughput and memory.
+
+Run from the repository root:
+
+    python benchmarks/bench_transfer.py
+
+A journal is seeded in a temporary database, exported to JSONL and CSV, and
+each file is imported into a second, empty journal. Peak Python memory is
+reported with tracemalloc and should stay about the same for every size,
+since rows are streamed in chunks rather than loaded at once. tracemalloc
+slows Python down, so rows/sec here is lower than what transfer.py reports.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import transfer  # noqa: E402
+from Journal_M import Journal  # noqa: E402
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def create_journal(path):
+    Journal.DB_FILE = path
+    return Journal()
+
+
+def seed(journal, size):
+    with journal.conn:
+        journal.conn.executemany(
+            'INSERT INTO journal_entries (number, title, content, mood, date) VALUES (?, ?, ?, ?, ?)',
+            ((n, f"Title {n}", "Lorem ipsum " * 20, "Happy", "2024-01-01T00:00:00") for n in range(1, size + 1))
+        )
+
+
+def measure(name, size, action, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = action(*args)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert count == size, (name, count)
+    print(f"{size:>10} | {name:<12} | {size / elapsed:>12.0f} | {peak / 2**20:>10.1f}")
+
+
+def main():
+    print(f"{'rows':>10} | {'step':<12} | {'rows/sec':>12} | {'peak (MB)':>10}")
+    print("-" * 54)
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'source.db')
+            seed(create_journal(source), size)
+            for fmt in transfer.FORMATS:
+                out = os.path.join(tmp, f'entries.{fmt}')
+                target = os.path.join(tmp, f'target_{fmt}.db')
+                create_journal(target)
+                measure(f'export {fmt}', size, transfer.export_table, source, 'journal_entries', out)
+                measure(f'import {fmt}', size, transfer.import_table, target, 'journal_entries', out)
+                db.close_connection(target)
+            db.close_connection(source)
+
+
+if __name__ == '__main__':
+    main()
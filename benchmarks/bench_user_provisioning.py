@@ -0,0 +1,64 @@
+"""Measure how fast user accounts can be seeded.
+
+Run from the repository root:
+
+    python benchmarks/bench_user_provisioning.py
+
+A temporary users database is seeded with 100k accounts through
+``LogInPanel/users.provision_users`` (passwords encrypted across a process pool,
+one transaction), then the same batch is provisioned again to time the
+all-conflicts path. For comparison, a smaller sample is registered one account
+at a time the way ``register_user`` used to: a new connection, CREATE TABLE IF
+NOT EXISTS, a duplicate check, an encrypt and a committed INSERT per user.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'LogInPanel'))
+
+import users  # noqa: E402
+
+USERS = 100_000
+ONE_BY_ONE = 2_000
+
+
+def register_one(path, username, password):
+    conn = sqlite3.connect(path)
+    users.create_table(conn)
+    if conn.execute("SELECT username FROM users WHERE username = ?", (username,)).fetchone() is None:
+        conn.execute("INSERT INTO users (username, password) VALUES (?, ?)",
+                     (username, users.cipher.encrypt(password.encode())))
+        conn.commit()
+    conn.close()
+
+
+def report(name, count, elapsed):
+    print(f"{name:<28} {count:>7} users in {elapsed:7.2f} s   {count / elapsed:9.0f} users/sec")
+
+
+def main():
+    accounts = [(f"user{i:06d}", f"password-{i}") for i in range(USERS)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'users.db')
+
+        started = time.perf_counter()
+        result = users.provision_users(accounts, path)
+        report('provision_users', result.created, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        again = users.provision_users(accounts, path)
+        assert again.created == 0 and len(again.conflicts) == USERS
+        report('provision_users (existing)', len(again.conflicts), time.perf_counter() - started)
+
+        path = os.path.join(tmp, 'one_by_one.db')
+        started = time.perf_counter()
+        for username, password in accounts[:ONE_BY_ONE]:
+            register_one(path, username, password)
+        report('one at a time', ONE_BY_ONE, time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Measure per-request latency of the Flask app.
+
+Run from the repository root:
+
+    python benchmarks/bench_web_requests.py
+
+The app is imported in a temporary working directory so its databases are
+created from scratch, a few hundred entries and tasks are posted, and then
+each route is requested repeatedly through Flask's test client. The numbers
+cover everything a request does apart from the network: opening storage,
+schema checks, queries and template rendering. (render) rows empty the page
+cache before every request, (cached) rows are served from it, and (304) rows
+are repeat views that send back the ETag of the previous response. The app
+runs with WE_MOVE_SINGLE_USER=1, so the requests need no login.
+"""
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+WEB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'we_move_web_transition')
+
+SEED = 300
+REQUESTS = 500
+
+
+def timed(client, method, url, **kwargs):
+    started = time.perf_counter()
+    response = getattr(client, method)(url, **kwargs)
+    elapsed = time.perf_counter() - started
+    assert response.status_code < 400, (url, response.status_code)
+    return elapsed
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p50 = statistics.median(timings) * 1000
+    p99 = timings[int(len(timings) * 0.99) - 1] * 1000
+    print(f"{name:<28} p50 {p50:7.3f} ms   p99 {p99:7.3f} ms")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for folder in ('templates', 'static'):
+            shutil.copytree(os.path.join(WEB_DIR, folder), os.path.join(tmp, folder))
+        os.chdir(tmp)
+        os.environ['WE_MOVE_JOURNAL_DB'] = os.path.join(tmp, 'journal.db')
+        os.environ['WE_MOVE_SINGLE_USER'] = '1'  # requests without a login, as LOCAL_USER
+        sys.path.insert(0, WEB_DIR)
+        import app as web_app  # noqa: E402
+
+        client = web_app.app.test_client()
+        for i in range(SEED):
+            client.post('/journal', data={'title': f'Entry {i}', 'content': 'Lorem ipsum ' * 20, 'mood': 'Happy'})
+            client.post('/self_goals', data={'task': f'Task {i}'})
+
+        for url in ('/journal', '/self_goals'):
+            report(f'GET {url} (render)', [
+                web_app.pages.clear() or timed(client, 'get', url) for _ in range(REQUESTS)
+            ])
+            report(f'GET {url} (cached)', [timed(client, 'get', url) for _ in range(REQUESTS)])
+        # Repeat views: the browser revalidates with the ETag it got last time
+        for url in ('/journal', '/self_goals'):
+            etag = client.get(url).headers['ETag']
+            report(f'GET {url} (304)', [
+                timed(client, 'get', url, headers={'If-None-Match': etag}) for _ in range(REQUESTS)
+            ])
+        report('POST /journal', [
+            timed(client, 'post', '/journal', data={'title': 'x', 'content': 'y', 'mood': 'Sad'})
+            for _ in range(REQUESTS)
+        ])
+        os.chdir(os.path.dirname(WEB_DIR))
+
+
+if __name__ == '__main__':
+    main()
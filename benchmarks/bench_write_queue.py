@@ -0,0 +1,58 @@
+"""Compare journal insert throughput with and without the write queue.
+
+Run from the repository root:
+
+    python benchmarks/bench_write_queue.py
+
+Several threads add entries through Journal_M.Journal at the same time, once
+per durability mode. In 'sync' every insert is its own commit; 'batched' and
+'async' group the inserts into shared transactions. The async run calls
+flush() before stopping the clock, so all three numbers count committed rows.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import write_queue  # noqa: E402
+from Journal_M import Journal  # noqa: E402
+
+THREADS = 8
+INSERTS_PER_THREAD = 500
+
+
+def worker():
+    journal = Journal()
+    for i in range(INSERTS_PER_THREAD):
+        journal.add_new_entry(f'Entry {i}', 'Lorem ipsum ' * 20, 'Happy')
+
+
+def run(mode):
+    if mode != write_queue.SYNC:
+        write_queue.enable(Journal.DB_FILE, mode)
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    write_queue.flush(Journal.DB_FILE)
+    elapsed = time.perf_counter() - started
+    write_queue.disable(Journal.DB_FILE)
+    total = THREADS * INSERTS_PER_THREAD
+    print(f"{mode:<8} {total} inserts in {elapsed:6.2f} s   {total / elapsed:8.0f} inserts/sec")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        Journal.DB_FILE = os.path.join(tmp, 'journal.db')
+        Journal()  # create the schema before the threads start
+        for mode in write_queue.MODES:
+            run(mode)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Load-test the web app as served in production (we_move_web_transition/serve.py).
+
+Run from the repository root:
+
+    python benchmarks/load_test_web.py [--workers 4] [--threads 8] [--duration 5]
+    python benchmarks/load_test_web.py --url http://127.0.0.1:8000
+
+Without --url the server is started on temporary journal and task databases,
+with WE_MOVE_SINGLE_USER=1 so the clients need no login, and seeded with some
+entries and tasks. A server given with --url needs the same setting. Each concurrency level then runs that many
+clients for --duration seconds, every client on its own keep-alive connection,
+sending a mix of page views (some revalidating with the ETag they were given),
+JSON API reads and writes. Latency percentiles and requests per second are
+reported per level, along with any failed requests.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVE = os.path.join(ROOT, 'we_move_web_transition', 'serve.py')
+
+LEVELS = [1, 4, 16, 64]
+SEED = 200
+WRITE_SHARE = 0.1  # fraction of requests that write
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=1)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+class Client:
+    # One simulated user on its own keep-alive connection
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+        self.etags = {}
+
+    def request(self, method, url, body=None, headers=None):
+        headers = dict(headers or {})
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.conn.request(method, url, body, headers)
+            response = self.conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            return None
+        return response
+
+    def step(self):
+        # One request from the mix; returns whether it succeeded
+        choice = random.random()
+        if choice < WRITE_SHARE / 2:
+            response = self.request('POST', '/api/v1/entries', {'title': 'Load', 'content': 'test', 'mood': 'Happy'})
+        elif choice < WRITE_SHARE:
+            response = self.request('POST', '/api/v1/tasks', {'description': 'Load test'})
+        elif choice < 0.5:
+            url = random.choice(('/journal', '/self_goals'))
+            headers = {'If-None-Match': self.etags[url]} if url in self.etags and random.random() < 0.5 else None
+            response = self.request('GET', url, headers=headers)
+            if response is not None and response.getheader('ETag'):
+                self.etags[url] = response.getheader('ETag')
+        else:
+            response = self.request('GET', random.choice(('/api/v1/entries?limit=20', '/api/v1/tasks?limit=20')))
+        return response is not None and response.status < 400
+
+
+def run_level(host, port, concurrency, duration):
+    timings, failures = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def user():
+        client = Client(host, port)
+        local, failed = [], 0
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            ok = client.step()
+            local.append(time.perf_counter() - started)
+            failed += not ok
+        client.conn.close()
+        with lock:
+            timings.extend(local)
+            failures[0] += failed
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=user) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    timings.sort()
+    p50 = statistics.median(timings) * 1000
+    p99 = timings[max(int(len(timings) * 0.99) - 1, 0)] * 1000
+    print(f"{concurrency:>11} | {len(timings) / elapsed:>9.0f} | {p50:>8.2f} | {p99:>8.2f} | {failures[0]:>6}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the web app at increasing concurrency.")
+    parser.add_argument('--url', help="test a server that is already running instead of starting one")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds per concurrency level")
+    parser.add_argument('--levels', type=int, nargs='+', default=LEVELS)
+    args = parser.parse_args(argv)
+
+    server = None
+    tmp = tempfile.TemporaryDirectory()
+    try:
+        if args.url:
+            parts = urlsplit(args.url)
+            host, port = parts.hostname, parts.port or 80
+        else:
+            host, port = '127.0.0.1', free_port()
+            env = dict(os.environ, WE_MOVE_JOURNAL_DB=os.path.join(tmp.name, 'journal.db'), WE_MOVE_SINGLE_USER='1')
+            server = subprocess.Popen(
+                [sys.executable, SERVE, '--bind', f'{host}:{port}',
+                 '--workers', str(args.workers), '--threads', str(args.threads), '--directory', tmp.name],
+                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            wait_until_up(host, port)
+            seeder = Client(host, port)
+            for i in range(SEED):
+                seeder.request('POST', '/api/v1/entries', {'title': f'Entry {i}', 'content': 'Lorem ipsum ' * 20, 'mood': 'Happy'})
+                seeder.request('POST', '/api/v1/tasks', {'description': f'Task {i}'})
+            print(f"Server: {args.workers} workers x {args.threads} threads")
+
+        print(f"{'concurrency':>11} | {'req/sec':>9} | {'p50 ms':>8} | {'p99 ms':>8} | {'failed':>6}")
+        print("-" * 55)
+        for concurrency in args.levels:
+            run_level(host, port, concurrency, args.duration)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Hammer entry-number allocation from several processes at once.
+
+Run from the repository root:
+
+    python benchmarks/stress_entry_numbers.py
+
+Every worker opens its own ``Journal`` on a shared temporary database and
+adds entries as fast as it can, the way several Flask workers or the desktop
+and web apps would. Afterwards the script checks that no entry number was
+handed out twice and compares insert latency at the start and the end of the
+run, which should stay about the same.
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+from Journal_M import Journal  # noqa: E402
+
+WORKERS = 8
+ENTRIES_PER_WORKER = 1_000
+
+
+def worker(db_file, worker_id, results):
+    Journal.DB_FILE = db_file
+    journal = Journal()
+    timings = []
+    for i in range(ENTRIES_PER_WORKER):
+        started = time.perf_counter()
+        result = journal.add_new_entry(f"Worker {worker_id} entry {i}", "Stress test", "Happy")
+        timings.append(time.perf_counter() - started)
+        if "Error" in result:
+            print(f"worker {worker_id}: {result}")
+    journal.conn.close()
+    results.put(timings)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "journal.db")
+        Journal.DB_FILE = db_file
+        Journal()  # create the schema before the workers race
+        db.close_connection(db_file)
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(db_file, worker_id, results))
+            for worker_id in range(WORKERS)
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        timings = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+        journal = Journal()
+        total, distinct = journal.conn.execute(
+            'SELECT COUNT(*), COUNT(DISTINCT number) FROM journal_entries'
+        ).fetchone()
+        db.close_connection(db_file)
+
+    window = ENTRIES_PER_WORKER // 10
+    first = [t for worker_timings in timings for t in worker_timings[:window]]
+    last = [t for worker_timings in timings for t in worker_timings[-window:]]
+
+    print(f"workers:            {WORKERS}")
+    print(f"entries written:    {total} in {elapsed:.2f}s")
+    print(f"duplicate numbers:  {total - distinct}")
+    print(f"avg insert, first {window}: {sum(first) / len(first) * 1000:.3f} ms")
+    print(f"avg insert, last {window}:  {sum(last) / len(last) * 1000:.3f} ms")
+    if total != distinct:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
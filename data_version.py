@@ -0,0 +1,50 @@
+"""Per-table data versions, for HTTP caching of pages built from a table.
+
+Every write through the storage classes calls bump() once it has committed.
+That touches a small marker file next to the database (`<db>.<table>.version`),
+and version() reads it back with a single stat() call. The version is
+therefore shared by every process using the database, including the desktop
+apps and several web workers, and checking it never opens SQLite. Callbacks
+registered with add_listener() hear about bumps made in the same process.
+"""
+import os
+import time
+from collections import namedtuple
+
+Version = namedtuple('Version', 'ns modified')  # ns: mtime in ns, modified: mtime in seconds
+
+_listeners = []
+
+
+def version_file(db_path, table):
+    return f"{os.path.abspath(db_path)}.{table}.version"
+
+
+def bump(db_path, table):
+    """Record that `table` in `db_path` has changed."""
+    path = version_file(db_path, table)
+    now = time.time_ns()
+    try:
+        os.utime(path, ns=(now, now))
+    except FileNotFoundError:
+        with open(path, 'a'):
+            pass
+        os.utime(path, ns=(now, now))
+    for listener in _listeners:
+        listener(os.path.abspath(db_path), table)
+
+
+def add_listener(callback):
+    """Call `callback(db_path, table)` after every bump() made in this process."""
+    _listeners.append(callback)
+
+
+def version(db_path, table):
+    """Current Version of `table` in `db_path`."""
+    path = version_file(db_path, table)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        bump(db_path, table)
+        stat = os.stat(path)
+    return Version(stat.st_mtime_ns, int(stat.st_mtime))
@@ -0,0 +1,129 @@
+"""Shared SQLite connections for the journal and task stores.
+
+Every thread gets one connection per database file, opened on first use and
+reused afterwards, with WAL journaling and the PRAGMAs below applied once.
+Schema creation goes through init_schema() so it runs once per process
+instead of every time a Journal or TaskList is constructed.
+
+Writes go through transaction(), which takes the write lock up front with
+BEGIN IMMEDIATE. A transaction that reads first and writes later can otherwise
+fail with SQLITE_BUSY straight away when another process commits in between,
+without waiting for busy_timeout. If the lock still can't be had after
+busy_timeout, the attempt is retried BUSY_RETRIES times with a growing,
+jittered pause, so several web workers and the desktop apps can write to the
+same file at once.
+"""
+import os
+import random
+import sqlite3
+import threading
+import time
+
+BUSY_TIMEOUT_MS = 5000
+BUSY_RETRIES = 5
+BUSY_BACKOFF = 0.01  # seconds before the first retry, doubled for each later one
+
+# The one journal database shared by the desktop apps and the web app
+DEFAULT_JOURNAL_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'journal.db')
+JOURNAL_DB = os.environ.get('WE_MOVE_JOURNAL_DB', DEFAULT_JOURNAL_DB)
+
+# Journal entries and tasks belong to a user (the id of their row in
+# LogInPanel/users.db). Rows written without a login, and everything written
+# before there were users, belong to LOCAL_USER.
+LOCAL_USER = 0
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",  # readers don't block the writer and vice versa
+    "PRAGMA synchronous = NORMAL",  # safe with WAL, avoids an fsync per commit
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size = -8000",  # 8 MB page cache
+    "PRAGMA temp_store = MEMORY",
+)
+
+_local = threading.local()
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+def get_connection(path):
+    """Return this thread's connection to `path`, opening it if needed."""
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    key = os.path.abspath(path)
+    conn = connections.get(key)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        connections[key] = conn
+    return conn
+
+
+def init_schema(path, name, create):
+    """Call `create()` the first time schema `name` is needed for `path`.
+
+    Later calls in the same process return immediately.
+    """
+    key = (os.path.abspath(path), name)
+    if key in _initialized:
+        return
+    with _init_lock:
+        if key not in _initialized:
+            create()
+            _initialized.add(key)
+
+
+def close_connection(path):
+    """Close this thread's connection to `path`, if it has one."""
+    connections = getattr(_local, 'connections', {})
+    conn = connections.pop(os.path.abspath(path), None)
+    if conn is not None:
+        conn.close()
+
+
+def is_busy(error):
+    """True if `error` means another connection holds a lock SQLite needs."""
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+def retry_busy(operation, retries=BUSY_RETRIES):
+    """Call `operation()`, retrying with backoff while it fails with SQLITE_BUSY."""
+    for attempt in range(retries + 1):
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            if attempt == retries or not is_busy(e):
+                raise
+            time.sleep(BUSY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def begin_immediate(conn):
+    """Start a write transaction on `conn`, retrying while the database is busy."""
+    retry_busy(lambda: conn.execute('BEGIN IMMEDIATE'))
+
+
+def transaction(conn, write):
+    """Run write(conn) in one BEGIN IMMEDIATE transaction and return its result.
+
+    The whole transaction is retried if it fails with SQLITE_BUSY, so `write`
+    must only touch the database. Inside a transaction that is already open,
+    write(conn) just joins it.
+    """
+    if conn.in_transaction:
+        return write(conn)
+
+    def attempt():
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = write(conn)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return result
+
+    return retry_busy(attempt)
@@ -0,0 +1,174 @@
+"""Mood counts per day, week and month for a journal table.
+
+The counts live in a `<table>_mood_counts` table, per user, and are kept up to
+date by SQLite triggers on every insert, edit and delete, so reading a trend
+never has to scan the entries themselves. Works for any entries table with
+`id`, `user_id`, `mood` and an ISO-8601 `date` column; the tables and triggers
+are created by the journal migrations (see migrations.py). Journals from before
+there were users kept one set of counts for everybody; `per_user=False` still
+describes that layout, which migration 4 creates and migration 7 replaces.
+"""
+import sqlite3
+
+import numpy as np
+
+import db
+
+# period -> (SQL expression turning an ISO date into the bucket, numpy unit, step).
+# Every expression is NULL for a date SQLite can't parse; such entries aren't counted.
+PERIODS = {
+    'day': ("date({date})", 'datetime64[D]', 1),
+    'week': ("date({date}, 'weekday 0', '-6 days')", 'datetime64[D]', 7),  # Monday of the week
+    'month': ("strftime('%Y-%m', {date})", 'datetime64[M]', 1),
+}
+
+
+class MoodStats:
+    def __init__(self, conn, table='journal_entries', user_id=db.LOCAL_USER, per_user=True):
+        self.conn = conn
+        self.table = table
+        self.user_id = user_id  # whose counts get_counts() and get_trend() read
+        self.per_user = per_user
+        self.counts_table = f"{table}_mood_counts"
+        # Leading columns of the counts' key
+        self.key = 'user_id, period, bucket, mood' if per_user else 'period, bucket, mood'
+
+    def create_schema(self, guard=None):
+        # Create the counts table and the triggers that maintain it. Existing
+        # entries are not counted; see backfill(). `guard` is an optional SQL
+        # condition with a {row} placeholder (old or new) that must hold for a
+        # trigger to touch the counts, used while a backfill is in progress.
+        self.conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {self.counts_table} (
+                {'user_id INTEGER NOT NULL,' if self.per_user else ''}
+                period TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                mood TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY ({self.key})
+            )
+        ''')
+        for statement in self.trigger_statements(guard):
+            self.conn.execute(statement)
+
+    def backfill(self, after_id, last_id):
+        # Add the entries with after_id < id <= last_id to the counts.
+        owner = 'user_id, ' if self.per_user else ''
+        for period, (bucket_sql, _, _) in PERIODS.items():
+            bucket = bucket_sql.format(date='date')
+            self.conn.execute(f'''
+                INSERT INTO {self.counts_table} ({self.key}, count)
+                SELECT {owner}?, {bucket}, mood, COUNT(*)
+                FROM {self.table}
+                WHERE id > ? AND id <= ? AND {bucket} IS NOT NULL AND mood IS NOT NULL
+                GROUP BY {owner}{bucket}, mood
+                ON CONFLICT ({self.key}) DO UPDATE SET count = count + excluded.count
+            ''', (period, after_id, last_id))
+
+    def drop_triggers(self):
+        for name in ('insert', 'delete', 'update_old', 'update_new'):
+            self.conn.execute(f'DROP TRIGGER IF EXISTS {self.table}_mood_{name}')
+
+    def trigger_statements(self, guard=None):
+        old_guard = f" AND {guard.format(row='old')}" if guard else ''
+        new_guard = f" AND {guard.format(row='new')}" if guard else ''
+        new_owner = 'new.user_id, ' if self.per_user else ''
+        old_owner = 'user_id = old.user_id AND ' if self.per_user else ''
+        columns = 'mood, date, user_id' if self.per_user else 'mood, date'
+        increment = []
+        decrement = []
+        for period, (bucket_sql, _, _) in PERIODS.items():
+            new_bucket = bucket_sql.format(date='new.date')
+            old_bucket = bucket_sql.format(date='old.date')
+            increment.append(f'''
+                INSERT INTO {self.counts_table} ({self.key}, count)
+                SELECT {new_owner}'{period}', {new_bucket}, new.mood, 1 WHERE {new_bucket} IS NOT NULL
+                ON CONFLICT ({self.key}) DO UPDATE SET count = count + 1;
+            ''')
+            decrement.append(f'''
+                UPDATE {self.counts_table} SET count = count - 1
+                WHERE {old_owner}period = '{period}' AND bucket = {old_bucket} AND mood = old.mood;
+                DELETE FROM {self.counts_table}
+                WHERE {old_owner}period = '{period}' AND bucket = {old_bucket} AND mood = old.mood
+                AND count <= 0;
+            ''')
+        increment = ''.join(increment)
+        decrement = ''.join(decrement)
+        return [
+            f'''
+            CREATE TRIGGER IF NOT EXISTS {self.table}_mood_insert AFTER INSERT ON {self.table}
+            WHEN new.date IS NOT NULL AND new.mood IS NOT NULL{new_guard}
+            BEGIN {increment} END
+            ''',
+            f'''
+            CREATE TRIGGER IF NOT EXISTS {self.table}_mood_delete AFTER DELETE ON {self.table}
+            WHEN old.date IS NOT NULL AND old.mood IS NOT NULL{old_guard}
+            BEGIN {decrement} END
+            ''',
+            f'''
+            CREATE TRIGGER IF NOT EXISTS {self.table}_mood_update_old AFTER UPDATE OF {columns} ON {self.table}
+            WHEN old.date IS NOT NULL AND old.mood IS NOT NULL{old_guard}
+            BEGIN {decrement} END
+            ''',
+            f'''
+            CREATE TRIGGER IF NOT EXISTS {self.table}_mood_update_new AFTER UPDATE OF {columns} ON {self.table}
+            WHEN new.date IS NOT NULL AND new.mood IS NOT NULL{new_guard}
+            BEGIN {increment} END
+            ''',
+        ]
+
+    def get_counts(self, period='week', start=None, end=None):
+        # Return (buckets, moods, counts) for the buckets between `start` and
+        # `end` (ISO strings or dates, inclusive). `buckets` is a contiguous
+        # numpy datetime64 range, so periods without entries show up as zeros;
+        # counts[i, j] is how often moods[j] was recorded in buckets[i].
+        bucket_sql, unit, step = PERIODS[period]
+        query = f'SELECT bucket, mood, count FROM {self.counts_table} WHERE user_id = ? AND period = ?'
+        params = [self.user_id, period]
+        if start is not None:
+            query += ' AND bucket >= ?'
+            params.append(np.datetime64(str(start)[:10]).astype(unit).astype(str))
+        if end is not None:
+            query += ' AND bucket <= ?'
+            params.append(np.datetime64(str(end)[:10]).astype(unit).astype(str))
+        try:
+            rows = self.conn.execute(query, params).fetchall()
+        except sqlite3.Error as e:
+            rows = []
+        if not rows:
+            return np.array([], dtype=unit), [], np.zeros((0, 0), dtype=np.int64)
+
+        bucket_values, row_moods, row_counts = zip(*rows)
+        bucket_values = np.array(bucket_values, dtype=unit)
+        moods = sorted(set(row_moods))
+        mood_index = np.searchsorted(moods, row_moods)
+
+        first = bucket_values.min()
+        buckets = np.arange(first, bucket_values.max() + step, step)
+        bucket_index = (bucket_values - first).astype(np.int64) // step
+
+        counts = np.zeros((len(buckets), len(moods)), dtype=np.int64)
+        np.add.at(counts, (bucket_index, mood_index), row_counts)
+        return buckets, moods, counts
+
+    def get_trend(self, period='week', window=4, start=None, end=None):
+        # Mood counts plus each mood's share of the entries per bucket and a
+        # rolling mean of that share over the last `window` buckets.
+        buckets, moods, counts = self.get_counts(period, start, end)
+        totals = counts.sum(axis=1, keepdims=True)
+        share = np.divide(counts, totals, out=np.zeros(counts.shape), where=totals > 0)
+
+        cumulative = np.vstack([np.zeros((1, len(moods))), np.cumsum(share, axis=0)])
+        upper = np.arange(1, len(buckets) + 1)
+        lower = np.maximum(upper - window, 0)
+        rolling_share = (cumulative[upper] - cumulative[lower]) / (upper - lower)[:, None]
+
+        return {
+            'period': period,
+            'window': window,
+            'buckets': buckets.astype(str).tolist(),
+            'moods': moods,
+            'counts': counts.tolist(),
+            'share': share.round(4).tolist(),
+            'rolling_share': rolling_share.round(4).tolist(),
+        }
@@ -0,0 +1,202 @@
+"""Bulk export and import of journal entries and tasks as JSONL or CSV.
+
+    python transfer.py export journal.db journal_entries entries.jsonl
+    python transfer.py import backup.db journal_entries entries.jsonl
+
+Rows are streamed in chunks of CHUNK_SIZE: exports read them with fetchmany()
+and imports insert them with executemany(), one transaction per chunk, so
+memory use does not grow with the size of the table. The format follows the
+file extension (.jsonl or .csv) unless given with --format.
+
+Only the columns both sides know about are copied, which is what lets a desktop
+`journal_entries` export be loaded into the web `entries` table and back. By
+default imported rows get new ids (and, for `journal_entries`, new entry numbers
+after the highest existing one of the same user) so they can be appended to a
+database that already has data; --keep-ids copies them as they are. Rows keep
+the user they belong to (db.LOCAL_USER if the file has none), or all go to the
+one given with --user. Dates in the old dd-mm-YYYY format are converted to
+ISO-8601 on the way into `journal_entries`. If a chunk fails, it is rolled back
+and the import stops; earlier chunks stay committed. The target table must
+exist, i.e. the app has been started once against that database. Search and
+mood statistics are kept up to date by the table's own triggers.
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import data_version
+import db
+from migrations import iso_date
+
+CHUNK_SIZE = 10000
+
+# table -> columns that can be exported and imported, in file order
+TABLES = {
+    'journal_entries': ('id', 'user_id', 'number', 'title', 'content', 'mood', 'date'),
+    'entries': ('id', 'title', 'content', 'mood', 'date'),  # web journals from before migrations.py
+    'tasks': ('id', 'user_id', 'description', 'completed'),
+}
+FORMATS = ('jsonl', 'csv')
+
+
+def table_columns(conn, table):
+    # Columns of `table` that TABLES knows about, in TABLES order
+    if table not in TABLES:
+        raise ValueError(f"Unknown table: {table}")
+    existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+    if not existing:
+        raise ValueError(f"Table {table} does not exist; start the app once to create it")
+    return [column for column in TABLES[table] if column in existing]
+
+
+def guess_format(path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt or path} (expected one of {', '.join(FORMATS)})")
+    return fmt
+
+
+def export_table(db_path, table, out_path, fmt=None, chunk_size=CHUNK_SIZE):
+    """Write every row of `table` to `out_path`; return the number of rows."""
+    fmt = guess_format(out_path, fmt)
+    conn = db.get_connection(db_path)
+    columns = table_columns(conn, table)
+    cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id")
+    count = 0
+    with open(out_path, 'w', newline='', encoding='utf-8') as out:
+        if fmt == 'csv':
+            writer = csv.writer(out)
+            writer.writerow(columns)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            if fmt == 'csv':
+                writer.writerows(rows)
+            else:
+                out.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in rows)
+            count += len(rows)
+    return count
+
+
+def read_rows(in_path, fmt):
+    # Yield one dict per row of the file
+    with open(in_path, newline='', encoding='utf-8') as source:
+        if fmt == 'csv':
+            for row in csv.DictReader(source):
+                # CSV can't tell NULL from an empty string; empty means NULL
+                yield {key: (value if value != '' else None) for key, value in row.items()}
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def import_table(db_path, table, in_path, fmt=None, keep_ids=False, chunk_size=CHUNK_SIZE, user_id=None):
+    """Append the rows in `in_path` to `table`; return the number of rows.
+
+    `user_id` gives every row to that user instead of the one in the file.
+    """
+    fmt = guess_format(in_path, fmt)
+    conn = db.get_connection(db_path)
+    columns = table_columns(conn, table)
+    if not keep_ids:
+        columns = [column for column in columns if column not in ('id', 'number')]
+    renumber = table == 'journal_entries' and not keep_ids
+    insert_columns = columns + ['number'] if renumber else columns
+    insert = (
+        f"INSERT INTO {table} ({', '.join(insert_columns)}) "
+        f"VALUES ({', '.join('?' for _ in insert_columns)})"
+    )
+
+    rows = read_rows(in_path, fmt)
+    if 'user_id' in columns:
+        rows = with_user(rows, user_id)
+    if table == 'journal_entries' and 'date' in columns:
+        rows = with_iso_dates(rows)
+    count = 0
+    while True:
+        chunk = [tuple(row.get(column) for column in columns) for row in itertools.islice(rows, chunk_size)]
+        if not chunk:
+            break
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if renumber:
+                # Numbered after each user's highest existing entry, in file order
+                user_index = columns.index('user_id')
+                last_numbers = {}
+                numbered = []
+                for row in chunk:
+                    owner = row[user_index]
+                    if owner not in last_numbers:
+                        last_numbers[owner] = conn.execute(
+                            'SELECT COALESCE(MAX(number), 0) FROM journal_entries WHERE user_id = ?', (owner,)
+                        ).fetchone()[0]
+                    last_numbers[owner] += 1
+                    numbered.append(row + (last_numbers[owner],))
+                chunk = numbered
+            conn.executemany(insert, chunk)
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        count += len(chunk)
+    if count:
+        data_version.bump(db_path, table)
+    return count
+
+
+def with_user(rows, user_id=None):
+    # Rows with their user_id set: `user_id` if given, else the row's own or LOCAL_USER
+    for row in rows:
+        if user_id is not None:
+            row['user_id'] = user_id
+        elif row.get('user_id') is None:
+            row['user_id'] = db.LOCAL_USER
+        else:
+            row['user_id'] = int(row['user_id'])  # CSV values are strings
+        yield row
+
+
+def with_iso_dates(rows):
+    # Rows with old dd-mm-YYYY dates (the web journals') rewritten as ISO-8601
+    for row in rows:
+        row['date'] = iso_date(row.get('date'))
+        yield row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import journal entries and tasks.")
+    parser.add_argument('action', choices=('export', 'import'))
+    parser.add_argument('database', help="SQLite file, e.g. journal.db or we_move_web_transition/your_database.db")
+    parser.add_argument('table', choices=sorted(TABLES))
+    parser.add_argument('file', help="JSONL or CSV file to write or read")
+    parser.add_argument('--format', choices=FORMATS, help="default: from the file extension")
+    parser.add_argument('--keep-ids', action='store_true', help="import ids and entry numbers unchanged")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--user', type=int, help="import every row as this user's (id from LogInPanel/users.db)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        if args.action == 'export':
+            count = export_table(args.database, args.table, args.file, args.format, args.chunk_size)
+        else:
+            count = import_table(args.database, args.table, args.file, args.format, args.keep_ids,
+                                 args.chunk_size, args.user)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error during {args.action}: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed > 0 else 0
+    print(f"{args.action.capitalize()}ed {count} rows of {args.table} in {elapsed:.2f} s ({rate:.0f} rows/sec)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
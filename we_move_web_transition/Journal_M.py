@@ -1,41 +1,113 @@
-import sqlite3
+import time
+
+import data_version
+import db
+import migrations
+import write_queue
+from mood_stats import MoodStats
 
 class Journal:
-    def __init__(self):
-        self.conn = sqlite3.connect('your_database.db')  # Update with your database
+    DB_FILE = db.JOURNAL_DB  # Shared with the desktop journal
+    PAGE_SIZE = 50
+    DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"  # ISO-8601, sorts and range-scans as plain text
+    FIELDS = ('id', 'title', 'content', 'mood', 'date')  # Columns of the rows returned below
+
+    def __init__(self, user_id=db.LOCAL_USER):
+        self.user_id = user_id  # Only this user's entries are read and written
+        self.conn = db.get_connection(Journal.DB_FILE)
         self.cursor = self.conn.cursor()
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                content TEXT NOT NULL,
-                mood TEXT NOT NULL
-            )
-        ''')
-        self.conn.commit()
+        self.mood_stats = MoodStats(self.conn, 'journal_entries', user_id)
+        # Runs once per process; see migrations.py for the schema
+        db.init_schema(Journal.DB_FILE, 'journal', lambda: migrations.migrate(Journal.DB_FILE))
+
+    def bump_version(self):
+        # Mark the entries as changed for HTTP caches; see data_version.py.
+        data_version.bump(Journal.DB_FILE, 'journal_entries')
 
     def add_new_entry(self, title, content, mood):
-        self.cursor.execute('''
-            INSERT INTO entries (title, content, mood)
-            VALUES (?, ?, ?)
-        ''', (title, content, mood))
-        self.conn.commit()
+        # Returns the new entry's id, or None if the write was queued asynchronously.
+        # The entry number is allocated inside the INSERT, like the desktop journal does.
+        entry_date = time.strftime(Journal.DATE_FORMAT, time.localtime())
+        return write_queue.run(self.conn, Journal.DB_FILE, lambda conn: conn.execute('''
+            INSERT INTO journal_entries (user_id, number, title, content, mood, date)
+            SELECT ?, COALESCE(MAX(number), 0) + 1, ?, ?, ?, ?
+            FROM journal_entries
+            WHERE user_id = ?
+            RETURNING id
+        ''', (self.user_id, title, content, mood, entry_date, self.user_id)).fetchone()[0], self.bump_version)
 
     def get_all_entries(self):
-        self.cursor.execute('SELECT * FROM entries')
+        return list(self.iter_entries())
+
+    def get_entries_page(self, after_id=0, limit=PAGE_SIZE, fields=FIELDS):
+        # Keyset pagination on the (user, id) index: cost depends on the page size only.
+        # Rows hold `fields` (a subset of FIELDS), by default (id, title, content, mood, date).
+        columns = ', '.join(field for field in fields if field in Journal.FIELDS)
+        self.cursor.execute(f'''
+            SELECT {columns} FROM journal_entries
+            WHERE user_id = ? AND id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (self.user_id, after_id, limit))
+        return self.cursor.fetchall()
+
+    def iter_entries(self, chunk_size=PAGE_SIZE):
+        after_id = 0
+        while True:
+            page = self.get_entries_page(after_id, chunk_size)
+            yield from page
+            if len(page) < chunk_size:
+                return
+            after_id = page[-1][0]
+
+    def get_entries_between(self, start, end):
+        # Entries written in [start, end), oldest first, using the (user, date) index.
+        # Accepts dates, datetimes or ISO-8601 strings.
+        start = start.isoformat() if hasattr(start, 'isoformat') else start
+        end = end.isoformat() if hasattr(end, 'isoformat') else end
+        self.cursor.execute('''
+            SELECT id, title, content, mood, date FROM journal_entries
+            WHERE user_id = ? AND date >= ? AND date < ?
+            ORDER BY date, id
+        ''', (self.user_id, start, end))
         return self.cursor.fetchall()
 
-    def edit_entry(self, entry_id, title, content, mood):
+    def search(self, query, limit=20):
+        # Ranked full-text search. Rows are (id, title, mood, snippet) with
+        # matches in [brackets]; the last word of the query may be a prefix.
+        terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+        if not terms:
+            return []
+        terms[-1] += '*'
+        # The index has the user's id as a column; matching it keeps the
+        # search to this user's entries (see migrations.user_search_index)
+        match = f'user_id:"{int(self.user_id)}" AND {{title content}}: ({" ".join(terms)})'
         self.cursor.execute('''
-            UPDATE entries
-            SET title = ?, content = ?, mood = ?
-            WHERE id = ?
-        ''', (title, content, mood, entry_id))
-        self.conn.commit()
+            SELECT e.id, e.title, e.mood, snippet(journal_entries_fts, -1, '[', ']', '...', 12)
+            FROM journal_entries_fts
+            JOIN journal_entries e ON e.id = journal_entries_fts.rowid
+            WHERE journal_entries_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        ''', (match, limit))
+        return self.cursor.fetchall()
+
+    def edit_entry(self, entry_id, title=None, content=None, mood=None):
+        # Fields left as None keep their current value
+        write_queue.run(self.conn, Journal.DB_FILE, lambda conn: conn.execute('''
+            UPDATE journal_entries
+            SET title = COALESCE(?, title), content = COALESCE(?, content), mood = COALESCE(?, mood)
+            WHERE id = ? AND user_id = ?
+        ''', (title, content, mood, entry_id, self.user_id)), self.bump_version)
+
+    def delete_entry(self, entry_id):
+        write_queue.run(self.conn, Journal.DB_FILE, lambda conn: conn.execute(
+            'DELETE FROM journal_entries WHERE id = ? AND user_id = ?', (entry_id, self.user_id)
+        ), self.bump_version)
 
     def get_entry_by_id(self, entry_id):
-        self.cursor.execute('SELECT * FROM entries WHERE id = ?', (entry_id,))
+        self.cursor.execute(
+            'SELECT id, title, content, mood, date FROM journal_entries WHERE id = ? AND user_id = ?',
+            (entry_id, self.user_id)
+        )
         return self.cursor.fetchone()
-
-    def __del__(self):
-        self.conn.close()
@@ -1,9 +1,20 @@
-import sqlite3
+import data_version
+import db
+import write_queue
 
 class TaskList:
-    def __init__(self):
-        self.conn = sqlite3.connect('your_database.db')  # Update with your database
+    DB_FILE = 'your_database.db'  # Update with your database
+    PAGE_SIZE = 50
+    FIELDS = ('id', 'description', 'completed')
+
+    def __init__(self, user_id=db.LOCAL_USER):
+        self.user_id = user_id  # Only this user's tasks are read and written
+        self.conn = db.get_connection(TaskList.DB_FILE)
         self.cursor = self.conn.cursor()
+        db.init_schema(TaskList.DB_FILE, 'tasks', self.create_table)
+
+    def create_table(self):
+        # Runs once per process, through db.init_schema()
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS tasks (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -11,26 +22,66 @@ class TaskList:
                 completed INTEGER DEFAULT 0
             )
         ''')
+        # Tasks from before there were users belong to LOCAL_USER
+        columns = [row[1] for row in self.cursor.execute('PRAGMA table_info(tasks)')]
+        if 'user_id' not in columns:
+            self.cursor.execute(f'ALTER TABLE tasks ADD COLUMN user_id INTEGER NOT NULL DEFAULT {db.LOCAL_USER}')
+        # A user's tasks in id order (the rowid ends the index), and by status
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user ON tasks (user_id)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user_completed ON tasks (user_id, completed, id)')
         self.conn.commit()
 
+    def bump_version(self):
+        # Mark the tasks as changed for HTTP caches; see data_version.py.
+        data_version.bump(TaskList.DB_FILE, 'tasks')
+
     def add_task(self, task_description):
-        self.cursor.execute('''
-            INSERT INTO tasks (description)
-            VALUES (?)
-        ''', (task_description,))
-        self.conn.commit()
+        # Returns the new task's id, or None if the write was queued asynchronously
+        return write_queue.run(self.conn, TaskList.DB_FILE, lambda conn: conn.execute('''
+            INSERT INTO tasks (user_id, description)
+            VALUES (?, ?)
+        ''', (self.user_id, task_description)).lastrowid, self.bump_version)
 
     def show_tasks(self):
-        self.cursor.execute('SELECT * FROM tasks')
+        self.cursor.execute(
+            'SELECT id, description, completed FROM tasks WHERE user_id = ? ORDER BY id', (self.user_id,)
+        )
+        return self.cursor.fetchall()
+
+    def get_tasks_page(self, after_id=0, limit=PAGE_SIZE, fields=FIELDS, completed=None):
+        # Keyset pagination on the user's ids, like Journal.get_entries_page().
+        # With `completed` set, only done (True) or open (False) tasks are listed,
+        # read from the (user, completed, id) index.
+        columns = ', '.join(field for field in fields if field in TaskList.FIELDS)
+        status = '' if completed is None else 'AND completed = ?'
+        params = (self.user_id, after_id) + (() if completed is None else (int(completed),))
+        self.cursor.execute(f'''
+            SELECT {columns} FROM tasks
+            WHERE user_id = ? AND id > ? {status}
+            ORDER BY id
+            LIMIT ?
+        ''', params + (limit,))
         return self.cursor.fetchall()
 
+    def get_task(self, task_id):
+        self.cursor.execute(
+            'SELECT id, description, completed FROM tasks WHERE id = ? AND user_id = ?', (task_id, self.user_id)
+        )
+        return self.cursor.fetchone()
+
+    def edit_task(self, task_id, description):
+        write_queue.run(self.conn, TaskList.DB_FILE, lambda conn: conn.execute(
+            'UPDATE tasks SET description = ? WHERE id = ? AND user_id = ?', (description, task_id, self.user_id)
+        ), self.bump_version)
+
+    def delete_task(self, task_id):
+        write_queue.run(self.conn, TaskList.DB_FILE, lambda conn: conn.execute(
+            'DELETE FROM tasks WHERE id = ? AND user_id = ?', (task_id, self.user_id)
+        ), self.bump_version)
+
     def mark_complete(self, task_id):
-        self.cursor.execute('''
+        write_queue.run(self.conn, TaskList.DB_FILE, lambda conn: conn.execute('''
             UPDATE tasks
             SET completed = 1
-            WHERE id = ?
-        ''', (task_id,))
-        self.conn.commit()
-
-    def __del__(self):
-        self.conn.close()
+            WHERE id = ? AND user_id = ?
+        ''', (task_id, self.user_id)), self.bump_version)
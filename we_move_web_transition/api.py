@@ -0,0 +1,240 @@
+"""JSON API for journal entries and tasks, mounted at /api/v1.
+
+    GET    /api/v1/entries?cursor=<id>&limit=<n>&fields=id,title
+    POST   /api/v1/entries                   {"title", "content", "mood"}
+    GET    /api/v1/entries/<id>
+    PATCH  /api/v1/entries/<id>              any of {"title", "content", "mood"}
+    DELETE /api/v1/entries/<id>
+
+    GET    /api/v1/tasks?cursor=<id>&limit=<n>&fields=id,completed&completed=0
+    POST   /api/v1/tasks                     {"description"}
+    GET    /api/v1/tasks/<id>
+    PATCH  /api/v1/tasks/<id>                {"description"} and/or {"completed": true}
+    POST   /api/v1/tasks/<id>/complete
+    DELETE /api/v1/tasks/<id>
+
+    POST   /api/v1/sessions                  {"username", "password"}
+    DELETE /api/v1/sessions
+
+Entries and tasks belong to the user whose session token comes with the
+request (`Authorization: Bearer <token>` or the `session_token` cookie, see
+auth.py); POST /sessions returns a token for a registered user's credentials
+and sets the cookie. Other requests without a valid token get a 401, unless
+the server runs with WE_MOVE_SINGLE_USER=1 (see auth.py).
+
+Lists are paged on the id: each response carries `next_cursor`, to be passed
+back as `cursor` for the next page (null on the last one), so every page costs
+the same however far into the list it is. `fields` limits both the columns read
+from SQLite and the keys in each item. Errors are {"error": "..."} with the
+matching status code.
+"""
+from flask import Blueprint, request, jsonify, abort, url_for, make_response
+
+import auth
+from auth import current_user_id
+from Journal_M import Journal
+from Self_Goals import TaskList
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+MAX_LIMIT = 200
+
+
+def page_args(all_fields):
+    # (cursor, limit, fields) from the query string
+    cursor = request.args.get('cursor', 0, type=int)
+    limit = request.args.get('limit', 50, type=int)
+    if limit < 1 or limit > MAX_LIMIT:
+        abort(400, f"limit must be between 1 and {MAX_LIMIT}")
+    fields = request.args.get('fields')
+    fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else list(all_fields)
+    unknown = [field for field in fields if field not in all_fields]
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(unknown)} (expected {', '.join(all_fields)})")
+    return cursor, limit, fields
+
+
+def query_fields(fields):
+    # Columns to read: the requested fields, always starting with the id for the cursor
+    return ['id'] + [field for field in fields if field != 'id']
+
+
+def page_response(rows, fields, limit, to_item):
+    columns = query_fields(fields)
+    items = []
+    for row in rows:
+        item = to_item(row, columns)
+        if 'id' not in fields:
+            del item['id']
+        items.append(item)
+    next_cursor = rows[-1][0] if len(rows) == limit else None
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+
+def json_body(required=(), optional=()):
+    # The request's JSON object restricted to the given keys, all strings
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400, "Expected a JSON object")
+    missing = [key for key in required if not body.get(key)]
+    if missing:
+        abort(400, f"Missing fields: {', '.join(missing)}")
+    values = {key: body[key] for key in tuple(required) + tuple(optional) if body.get(key) is not None}
+    if any(not isinstance(value, str) for value in values.values()):
+        abort(400, "Fields must be strings")
+    return values, body
+
+
+def entry_item(row, columns=Journal.FIELDS):
+    return dict(zip(columns, row))
+
+
+def task_item(row, columns=TaskList.FIELDS):
+    item = dict(zip(columns, row))
+    if 'completed' in item:
+        item['completed'] = bool(item['completed'])
+    return item
+
+
+def created(item, location):
+    # 201 with the stored item, or 202 when the write was queued asynchronously
+    if item is None:
+        return jsonify({'status': 'queued'}), 202
+    response = jsonify(item)
+    response.status_code = 201
+    response.headers['Location'] = location
+    return response
+
+
+@api.errorhandler(400)
+@api.errorhandler(401)
+@api.errorhandler(404)
+def json_error(error):
+    return jsonify({'error': error.description}), error.code
+
+
+@api.route('/entries')
+def list_entries():
+    cursor, limit, fields = page_args(Journal.FIELDS)
+    rows = Journal(current_user_id()).get_entries_page(cursor, limit, query_fields(fields))
+    return page_response(rows, fields, limit, entry_item)
+
+
+@api.route('/entries', methods=['POST'])
+def create_entry():
+    values, _ = json_body(required=('title', 'content', 'mood'))
+    journal = Journal(current_user_id())
+    entry_id = journal.add_new_entry(values['title'], values['content'], values['mood'])
+    entry = journal.get_entry_by_id(entry_id) if entry_id is not None else None
+    item = entry_item(entry) if entry else None
+    return created(item, url_for('api.get_entry', entry_id=entry_id) if entry_id else None)
+
+
+@api.route('/entries/<int:entry_id>')
+def get_entry(entry_id):
+    entry = Journal(current_user_id()).get_entry_by_id(entry_id)
+    if entry is None:
+        abort(404, "No such entry")
+    return jsonify(entry_item(entry))
+
+
+@api.route('/entries/<int:entry_id>', methods=['PATCH'])
+def update_entry(entry_id):
+    values, _ = json_body(optional=('title', 'content', 'mood'))
+    journal = Journal(current_user_id())
+    if journal.get_entry_by_id(entry_id) is None:
+        abort(404, "No such entry")
+    journal.edit_entry(entry_id, values.get('title'), values.get('content'), values.get('mood'))
+    return jsonify(entry_item(journal.get_entry_by_id(entry_id)))
+
+
+@api.route('/entries/<int:entry_id>', methods=['DELETE'])
+def delete_entry(entry_id):
+    journal = Journal(current_user_id())
+    if journal.get_entry_by_id(entry_id) is None:
+        abort(404, "No such entry")
+    journal.delete_entry(entry_id)
+    return '', 204
+
+
+@api.route('/tasks')
+def list_tasks():
+    cursor, limit, fields = page_args(TaskList.FIELDS)
+    completed = request.args.get('completed')
+    if completed not in (None, '0', '1'):
+        abort(400, "completed must be 0 or 1")
+    completed = None if completed is None else int(completed)
+    rows = TaskList(current_user_id()).get_tasks_page(cursor, limit, query_fields(fields), completed)
+    return page_response(rows, fields, limit, task_item)
+
+
+@api.route('/tasks', methods=['POST'])
+def create_task():
+    values, _ = json_body(required=('description',))
+    task_list = TaskList(current_user_id())
+    task_id = task_list.add_task(values['description'])
+    task = task_list.get_task(task_id) if task_id is not None else None
+    item = task_item(task) if task else None
+    return created(item, url_for('api.get_task', task_id=task_id) if task_id else None)
+
+
+@api.route('/tasks/<int:task_id>')
+def get_task(task_id):
+    task = TaskList(current_user_id()).get_task(task_id)
+    if task is None:
+        abort(404, "No such task")
+    return jsonify(task_item(task))
+
+
+@api.route('/tasks/<int:task_id>', methods=['PATCH'])
+def update_task(task_id):
+    values, body = json_body(optional=('description',))
+    completed = body.get('completed')
+    if completed not in (None, True):
+        abort(400, "completed can only be set to true")
+    task_list = TaskList(current_user_id())
+    if task_list.get_task(task_id) is None:
+        abort(404, "No such task")
+    if 'description' in values:
+        task_list.edit_task(task_id, values['description'])
+    if completed:
+        task_list.mark_complete(task_id)
+    return jsonify(task_item(task_list.get_task(task_id)))
+
+
+@api.route('/tasks/<int:task_id>/complete', methods=['POST'])
+def complete_task(task_id):
+    task_list = TaskList(current_user_id())
+    if task_list.get_task(task_id) is None:
+        abort(404, "No such task")
+    task_list.mark_complete(task_id)
+    return jsonify(task_item(task_list.get_task(task_id)))
+
+
+@api.route('/tasks/<int:task_id>', methods=['DELETE'])
+def delete_task(task_id):
+    task_list = TaskList(current_user_id())
+    if task_list.get_task(task_id) is None:
+        abort(404, "No such task")
+    task_list.delete_task(task_id)
+    return '', 204
+
+
+@api.route('/sessions', methods=['POST'])
+def create_session():
+    values, _ = json_body(required=('username', 'password'))
+    login = auth.log_in(values['username'], values['password'])
+    if login is None:
+        abort(401, "Wrong username or password")
+    token, session = login
+    response = jsonify({'token': token, 'username': session.username, 'expires_at': session.expires_at})
+    response.status_code = 201
+    return auth.set_cookie(response, token, session)
+
+
+@api.route('/sessions', methods=['DELETE'])
+def delete_session():
+    auth.log_out()
+    response = make_response('', 204)
+    response.delete_cookie(auth.TOKEN_COOKIE)
+    return response
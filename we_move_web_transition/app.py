@@ -1,40 +1,156 @@
-from flask import Flask, render_template, request, redirect, url_for
+from flask import Flask, render_template, request, redirect, url_for, jsonify, abort, make_response
+import os
 import sys
 import sqlite3
 import time
 
+# Modules shared with the desktop app (db, mood_stats, ...) live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from Journal_M import Journal
 from Self_Goals import TaskList
+from mood_stats import PERIODS
+import data_version
+import write_queue
+from api import api
+import auth
+from auth import current_user_id
+from fragment_cache import FragmentCache
 
 app = Flask(__name__)
+app.register_blueprint(api)
+
+# Create the schema once at startup rather than on the first request
+Journal()
+TaskList()
+
+# Rendered journal and goals pages, per user, reused until their table changes
+pages = FragmentCache()
+
+# Set WE_MOVE_WRITE_MODE=batched to group concurrent writes into shared commits.
+# 'async' returns before the commit, so a redirect may not show the new row yet.
+WRITE_MODE = os.environ.get('WE_MOVE_WRITE_MODE', write_queue.SYNC)
+if WRITE_MODE != write_queue.SYNC:
+    for db_file in {Journal.DB_FILE, TaskList.DB_FILE}:
+        write_queue.enable(db_file, WRITE_MODE)
+
+def page_etag(table, version):
+    # Pages differ per user, the data version is per table
+    return f"{table}-{current_user_id()}-{version.ns}"
+
+def not_modified(db_file, table):
+    # Check a conditional GET against the table's data version, before any
+    # SQLite or template work. Returns (304 response or None, version).
+    version = data_version.version(db_file, table)
+    etag = page_etag(table, version)
+    # Only the ETag is trusted: it carries the user and the ns mtime, while
+    # If-Modified-Since has whole seconds and no user, so it could 304 a page
+    # written in the same second or belonging to someone else.
+    if request.if_none_match.contains(etag):
+        return cache_headers(make_response('', 304), etag), version
+    return None, version
+
+def cache_headers(response, etag):
+    response.set_etag(etag)  # no Last-Modified, see not_modified()
+    response.headers['Cache-Control'] = 'private, no-cache'  # always revalidate, usually for a 304
+    response.vary.update(('Authorization', 'Cookie'))  # the page depends on who is logged in
+    return response
+
+def conditional_page(table, version, html):
+    return cache_headers(make_response(html), page_etag(table, version))
+
+@app.errorhandler(401)
+def log_in_first(error):
+    # Pages ask for a login instead; the API answers with JSON (see api.py)
+    return render_template('login.html', next=request.full_path.rstrip('?'), error=None), 401
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    next_page = request.values.get('next', '')
+    if not next_page.startswith('/') or next_page.startswith('//'):
+        next_page = url_for('index')  # only ever redirect within the app
+    if request.method == 'GET':
+        return render_template('login.html', next=next_page, error=None)
+    login = auth.log_in(request.form.get('username', ''), request.form.get('password', ''))
+    if login is None:
+        return render_template('login.html', next=next_page, error="Wrong username or password"), 401
+    token, session = login
+    return auth.set_cookie(redirect(next_page), token, session)
+
+@app.route('/logout', methods=['POST'])
+def logout():
+    auth.log_out()
+    response = redirect(url_for('index'))
+    response.delete_cookie(auth.TOKEN_COOKIE)
+    return response
+
 @app.route('/journal', methods=['GET', 'POST'])
 def journal():
-    journal = Journal()
+    if request.method == 'GET':
+        response, version = not_modified(Journal.DB_FILE, 'journal_entries')
+        if response is not None:
+            return response
     if request.method == 'POST':
         title = request.form['title']
         content = request.form['content']
         mood = request.form['mood']
-        journal.add_new_entry(title, content, mood)
+        Journal(current_user_id()).add_new_entry(title, content, mood)
         return redirect(url_for('journal'))
 
-    entries = journal.get_all_entries()
-    return render_template('journal.html', entries=entries)
+    after_id = request.args.get('after', 0, type=int)
+    user_id = current_user_id()
+
+    def render():
+        entries = Journal(user_id).get_entries_page(after_id, Journal.PAGE_SIZE)
+        next_after = entries[-1][0] if len(entries) == Journal.PAGE_SIZE else None
+        return render_template('journal.html', entries=entries, next_after=next_after)
+
+    html = pages.get_or_render(Journal.DB_FILE, 'journal_entries', version, f"{user_id}-{after_id}", render)
+    return conditional_page('journal_entries', version, html)
+
+@app.route('/journal/search')
+def journal_search():
+    query = request.args.get('q', '').strip()
+    results = Journal(current_user_id()).search(query) if query else []
+    return render_template('search.html', query=query, results=results)
+
+@app.route('/journal/mood_trends')
+def mood_trends():
+    period = request.args.get('period', 'week')
+    if period not in PERIODS:
+        abort(400)
+    window = request.args.get('window', 4, type=int)
+    start = request.args.get('start')
+    end = request.args.get('end')
+    journal = Journal(current_user_id())
+    try:
+        trend = journal.mood_stats.get_trend(period, max(window, 1), start, end)
+    except ValueError:
+        abort(400)  # start/end that aren't ISO dates
+    return jsonify(trend)
 
 @app.route('/self_goals', methods=['GET', 'POST'])
 def self_goals():
-    task_list = TaskList()
+    if request.method == 'GET':
+        response, version = not_modified(TaskList.DB_FILE, 'tasks')
+        if response is not None:
+            return response
     if request.method == 'POST':
         task_description = request.form['task']
-        task_list.add_task(task_description)
+        TaskList(current_user_id()).add_task(task_description)
         return redirect(url_for('self_goals'))
 
-    tasks = task_list.show_tasks()
-    return render_template('self_goals.html', tasks=tasks)
+    user_id = current_user_id()
+
+    def render():
+        return render_template('self_goals.html', tasks=TaskList(user_id).show_tasks())
+
+    html = pages.get_or_render(TaskList.DB_FILE, 'tasks', version, f"{user_id}-0", render)
+    return conditional_page('tasks', version, html)
 
 if __name__ == "__main__":
     app.run(debug=True)
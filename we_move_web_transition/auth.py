@@ -0,0 +1,80 @@
+"""Which user a web request is made for.
+
+A request names its user with the token from a login (POST /api/v1/sessions),
+sent either as `Authorization: Bearer <token>` or in the `session_token`
+cookie. Sessions are the ones LogInPanel/sessions.py keeps for the desktop
+login, so a token is checked with a dict lookup rather than a query. A request
+for entries or tasks without a token, or with one that is unknown or expired,
+gets a 401.
+
+A server for one person can set WE_MOVE_SINGLE_USER=1 instead: requests
+without a token then read and write db.LOCAL_USER's entries and tasks (the
+desktop apps' data when nobody logs in), as every request did before there
+were users. Anyone who can reach such a server can read them.
+"""
+import os
+import sys
+
+from flask import abort, g, request
+
+import db
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'LogInPanel'))
+
+import sessions  # noqa: E402
+import users  # noqa: E402
+
+TOKEN_COOKIE = 'session_token'
+
+SINGLE_USER = os.environ.get('WE_MOVE_SINGLE_USER', '').lower() in ('1', 'true', 'yes', 'on')
+
+
+def request_token():
+    """The session token sent with the current request, or None."""
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):].strip() or None
+    return request.cookies.get(TOKEN_COOKIE) or None
+
+
+def current_user_id():
+    """Id of the user the current request is made for."""
+    if 'user_id' not in g:
+        token = request_token()
+        if token is None:
+            if not SINGLE_USER:
+                abort(401, "Log in first")
+            g.user_id = db.LOCAL_USER
+        else:
+            session = sessions.default_manager().lookup(token)
+            if session is None:
+                abort(401, "Unknown or expired session")
+            g.user_id = session.user_id
+    return g.user_id
+
+
+def log_in(username, password):
+    """Start a session for valid credentials and return (token, Session), or None."""
+    conn = users.connect()
+    try:
+        if users.check_password(conn, username, password) != users.OK:
+            return None
+        user_id = users.find_user_id(conn, username)
+    finally:
+        conn.close()
+    manager = sessions.default_manager()
+    token = manager.issue(user_id, username)
+    return token, manager.lookup(token)
+
+
+def set_cookie(response, token, session):
+    """Make `response` store the session token in the browser until it expires."""
+    response.set_cookie(TOKEN_COOKIE, token, expires=session.expires_at, httponly=True, samesite='Lax')
+    return response
+
+
+def log_out():
+    """End the current request's session, if it sent one."""
+    token = request_token()
+    if token is not None:
+        sessions.default_manager().revoke(token)
@@ -0,0 +1,127 @@
+"""Cache of rendered pages, keyed by table version and page.
+
+A page built from one table is stored under (database, table, data version,
+page), so a cached copy can only be served while the table is unchanged. Writes
+made in this process drop that table's pages straight away through a
+data_version listener: add_new_entry/edit_entry clear only journal pages and
+add_task/mark_complete only task pages. Writes from other processes bump the
+version, so their stale pages are never looked up again; on disk they are
+deleted the next time a page of that table is stored.
+
+Pages are kept in a bounded in-process LRU (WE_MOVE_FRAGMENT_CACHE_SIZE pages,
+0 turns the cache off). Setting WE_MOVE_FRAGMENT_CACHE_DIR adds an on-disk tier
+there, shared by every worker and kept across restarts.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import data_version
+
+MAX_ENTRIES = int(os.environ.get('WE_MOVE_FRAGMENT_CACHE_SIZE', 256))
+CACHE_DIR = os.environ.get('WE_MOVE_FRAGMENT_CACHE_DIR')
+
+
+class FragmentCache:
+    def __init__(self, max_entries=MAX_ENTRIES, directory=CACHE_DIR):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data_version.add_listener(self.invalidate)
+
+    def get_or_render(self, db_path, table, version, page, render):
+        """Cached HTML for `page` of `table` at `version`, calling `render()` on a miss."""
+        key = (os.path.abspath(db_path), table, version.ns, page)
+        html = self.get(key)
+        if html is None:
+            self.misses += 1
+            html = render()
+            self.put(key, html)
+        else:
+            self.hits += 1
+        return html
+
+    def get(self, key):
+        with self.lock:
+            html = self.entries.get(key)
+            if html is not None:
+                self.entries.move_to_end(key)
+                return html
+        if self.directory:
+            try:
+                with open(self.file_path(key), encoding='utf-8') as f:
+                    html = f.read()
+            except OSError:
+                return None
+            self.remember(key, html)
+        return html
+
+    def put(self, key, html):
+        self.remember(key, html)
+        if self.directory:
+            path = self.file_path(key)
+            temporary = os.path.join(self.directory, f".{os.getpid()}-{threading.get_ident()}.tmp")
+            try:
+                with open(temporary, 'w', encoding='utf-8') as f:
+                    f.write(html)
+                os.replace(temporary, path)  # readers never see half a page
+            except OSError as e:
+                print(f"Error writing page cache: {e}")
+                return
+            # Pages of older versions, e.g. left by a write in another
+            # process, can never be served again
+            self.remove_files(key[0], key[1], older_than=key[2])
+
+    def remember(self, key, html):
+        # Store in the LRU, dropping the least recently used pages past the limit
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = html
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, db_path, table):
+        """Drop every cached page of `table` in `db_path`."""
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == db_path and key[1] == table]:
+                del self.entries[key]
+        if self.directory:
+            self.remove_files(db_path, table)
+
+    def remove_files(self, db_path, table, older_than=None):
+        # Delete the on-disk pages of `table`, or only those of versions before `older_than`
+        prefix = self.file_prefix(db_path, table)
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.startswith(prefix):
+                continue
+            if older_than is not None:
+                ns = name.rsplit('.', 2)[-2]  # <prefix><page>.<ns>.html
+                if not ns.isdigit() or int(ns) >= older_than:
+                    continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass  # already removed by another worker
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def file_prefix(self, db_path, table):
+        database = hashlib.sha1(db_path.encode()).hexdigest()[:12]
+        return f"{database}.{table}."
+
+    def file_path(self, key):
+        db_path, table, ns, page = key
+        return os.path.join(self.directory, f"{self.file_prefix(db_path, table)}{page}.{ns}.html")
@@ -0,0 +1,83 @@
+"""Production entry point for the web app.
+
+    python we_move_web_transition/serve.py [--bind 0.0.0.0:8000] [--workers 4] [--threads 8]
+                                           [--directory DIR]
+
+Runs app.py under gunicorn (pip install gunicorn) with several worker
+processes, each serving requests from a pool of threads, so a request waiting
+on SQLite only holds up its own thread. Workers import the app themselves
+after forking, which gives each one its own connections and write queue.
+
+Concurrent writers are kept safe by db.py: WAL journaling, busy_timeout, and
+BEGIN IMMEDIATE transactions retried on SQLITE_BUSY. Page caches are kept
+consistent across workers by the data versions in data_version.py; set
+WE_MOVE_FRAGMENT_CACHE_DIR to let the workers share rendered pages too.
+
+Every journal and task request needs a login (see auth.py). Set
+WE_MOVE_SINGLE_USER=1 only for a server that a single person uses.
+
+Relative database paths (the tasks' your_database.db) resolve against
+--directory, by default this folder, as with `python app.py` run from here.
+Defaults can also come from WE_MOVE_BIND, WE_MOVE_WORKERS and WE_MOVE_THREADS.
+`python app.py` still starts the single-threaded development server.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+
+WEB_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BIND = os.environ.get('WE_MOVE_BIND', '127.0.0.1:8000')
+WORKERS = int(os.environ.get('WE_MOVE_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+THREADS = int(os.environ.get('WE_MOVE_THREADS', 8))
+
+
+def options(bind=BIND, workers=WORKERS, threads=THREADS):
+    """gunicorn settings for serving the app."""
+    return {
+        'bind': bind,
+        'workers': workers,
+        'worker_class': 'gthread',
+        'threads': threads,
+        'preload_app': False,  # import the app in each worker, after the fork
+        'keepalive': 5,
+        'timeout': 30,
+        'graceful_timeout': 10,
+        'accesslog': None,
+        'errorlog': '-',
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the journal web app with several workers.")
+    parser.add_argument('--bind', default=BIND, help="host:port to listen on")
+    parser.add_argument('--workers', type=int, default=WORKERS, help="worker processes")
+    parser.add_argument('--threads', type=int, default=THREADS, help="request threads per worker")
+    parser.add_argument('--directory', default=WEB_DIR, help="working directory for relative database paths")
+    args = parser.parse_args(argv)
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("Error: serving needs gunicorn (pip install gunicorn)", file=sys.stderr)
+        return 1
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in options(args.bind, args.workers, args.threads).items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            sys.path.insert(0, WEB_DIR)
+            from app import app
+            return app
+
+    os.chdir(args.directory)
+    print(f"Serving on http://{args.bind} with {args.workers} workers x {args.threads} threads")
+    Server().run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
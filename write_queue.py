@@ -0,0 +1,186 @@
+"""Optional background writer that groups journal and task writes into batches.
+
+By default every write commits on the caller's thread, as it always has. Once
+enable() is called for a database file, writes to that file go through a
+WriteQueue instead: a single writer thread collects whatever writes are
+pending, runs them inside one transaction (each in its own savepoint, so a
+failing write doesn't take the others down with it) and commits once. Any
+exception a write raises is handed to that write's caller; the writer thread
+itself never stops on one.
+
+Durability modes:
+
+    SYNC     commit on the caller's thread before returning (same as no queue)
+    BATCHED  wait until the batch holding the write is committed. A batch is
+             whatever queued up while the previous one was committing, plus
+             anything arriving within `max_latency` seconds (0 by default)
+    ASYNC    return immediately; the write lands with the next batch. Errors
+             are printed by the writer thread. Call flush() before reading
+             your own writes.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import db
+
+SYNC = 'sync'
+BATCHED = 'batched'
+ASYNC = 'async'
+MODES = (SYNC, BATCHED, ASYNC)
+
+_queues = {}
+_queues_lock = threading.Lock()
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self, path, mode=BATCHED, max_latency=0.0, max_batch=500):
+        if mode not in MODES:
+            raise ValueError(f"Unknown write mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.max_latency = max_latency
+        self.max_batch = max_batch
+        self.pending = queue.Queue()
+        self.thread = None
+        if mode != SYNC:
+            self.thread = threading.Thread(target=self.run, name=f"write-queue:{path}", daemon=True)
+            self.thread.start()
+
+    def submit(self, write, after_commit=None):
+        # Run write(conn) according to the queue's mode and return its result,
+        # or None in ASYNC mode. after_commit() is called once the write is
+        # committed.
+        if self.mode == SYNC:
+            result = db.transaction(db.get_connection(self.path), write)
+            if after_commit is not None:
+                after_commit()
+            return result
+        future = Future()
+        self.pending.put((write, future, after_commit))
+        if self.mode == ASYNC:
+            return None
+        return future.result()
+
+    def flush(self):
+        # Block until every write submitted before this call is committed.
+        if self.mode == SYNC:
+            return
+        future = Future()
+        self.pending.put((None, future, None))
+        future.result()
+
+    def close(self):
+        # Commit what is pending and stop the writer thread.
+        if self.thread is not None and self.thread.is_alive():
+            self.pending.put((_STOP, None, None))
+            self.thread.join()
+
+    def next_batch(self):
+        first = self.pending.get()
+        batch = [first]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch and batch[-1][0] is not _STOP:
+            timeout = deadline - time.monotonic()
+            try:
+                batch.append(self.pending.get(timeout=timeout) if timeout > 0 else self.pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        conn = db.get_connection(self.path)
+        while True:
+            batch = self.next_batch()
+            done = []
+            try:
+                db.begin_immediate(conn)
+                for write, future, after_commit in batch:
+                    if write is None or write is _STOP:
+                        done.append((future, None, None, None))
+                        continue
+                    conn.execute('SAVEPOINT queued_write')
+                    try:
+                        result = write(conn)
+                        conn.execute('RELEASE queued_write')
+                        done.append((future, result, None, after_commit))
+                    except Exception as e:  # the write's own bug fails only that write
+                        conn.execute('ROLLBACK TO queued_write')
+                        conn.execute('RELEASE queued_write')
+                        done.append((future, None, e, None))
+                conn.commit()
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                done = [(future, None, e, None) for _, future, _ in batch]
+
+            for future, result, error, after_commit in done:
+                if after_commit is not None:
+                    # The write is committed whatever the callback does; its
+                    # caller still gets the result and the thread keeps going
+                    try:
+                        after_commit()
+                    except Exception as e:
+                        print(f"Error after queued write: {e}")
+                if future is None:
+                    continue
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+                    if self.mode == ASYNC:
+                        print(f"Error in queued write: {error}")
+            if any(write is _STOP for write, _, _ in batch):
+                db.close_connection(self.path)
+                return
+
+
+def enable(path, mode=BATCHED, max_latency=0.0, max_batch=500):
+    """Route writes to `path` through a WriteQueue with the given mode."""
+    key = os.path.abspath(path)
+    with _queues_lock:
+        old = _queues.pop(key, None)
+        if old is not None:
+            old.close()
+        _queues[key] = WriteQueue(path, mode, max_latency, max_batch)
+    return _queues[key]
+
+
+def disable(path):
+    """Flush and stop the queue for `path`; writes go back to the caller's thread."""
+    with _queues_lock:
+        old = _queues.pop(os.path.abspath(path), None)
+    if old is not None:
+        old.close()
+
+
+def flush(path):
+    """Barrier: wait until every queued write to `path` is committed."""
+    write_queue = _queues.get(os.path.abspath(path))
+    if write_queue is not None:
+        write_queue.flush()
+
+
+def run(conn, path, write, after_commit=None):
+    """Run write(conn) through the queue for `path`, or in a transaction on `conn`.
+
+    after_commit(), if given, is called once the write has been committed.
+    Without a queue the transaction is db.transaction(), retried on SQLITE_BUSY.
+    """
+    write_queue = _queues.get(os.path.abspath(path))
+    if write_queue is None:
+        result = db.transaction(conn, write)
+        if after_commit is not None:
+            after_commit()
+        return result
+    return write_queue.submit(write, after_commit)
+
+
+@atexit.register
+def _close_all():
+    for key in list(_queues):
+        disable(key)